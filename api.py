@@ -0,0 +1,146 @@
+"""
+Transport-neutral request handlers shared by the Flask server (web_server.py)
+and the asyncio server (async_server.py). Each returns (payload, status);
+dict payloads are sent as JSON, str payloads as metrics text.
+"""
+import json
+import metrics
+from message_queue import PRIORITIES, NORMAL, QueueFull
+from speech_manager import SpeechManager
+
+
+def queue_full(error: QueueFull):
+    """429 payload telling the producer when to retry"""
+    return {"error": "Message queue full", "depth": error.depth,
+            "retry_after_s": round(error.retry_after or 0.0, 2)}, 429
+
+
+def priority_of(data):
+    """'urgent', 'normal' (default) or 'ambient'; None if invalid"""
+    priority = data.get("priority", "normal")
+    return PRIORITIES.get(priority) if isinstance(priority, str) else None
+
+
+def post_message(speech_manager: SpeechManager, data):
+    """{"text": "...", "priority": "urgent" | "normal" | "ambient", "key": "optional id to supersede"}"""
+    text = data.get("text")
+    if not isinstance(text, str) or not text:
+        return {"error": "Missing 'text'"}, 400
+    priority = priority_of(data)
+    if priority is None:
+        return {"error": f"'priority' must be one of {sorted(PRIORITIES)}"}, 400
+    try:
+        return speech_manager.enqueue(text, priority, data.get("key")), 200
+    except QueueFull as e:
+        return queue_full(e)
+
+
+def post_messages(speech_manager: SpeechManager, data):
+    """Batch of messages in one request: {"messages": ["...", "..."], "priority": "normal"}"""
+    messages = data.get("messages")
+    if not isinstance(messages, list) or not all(isinstance(m, str) and m for m in messages):
+        return {"error": "Missing 'messages' list"}, 400
+    priority = priority_of(data)
+    if priority is None:
+        return {"error": f"'priority' must be one of {sorted(PRIORITIES)}"}, 400
+    result = {"status": "queued", "count": 0, "rejected": 0}
+    for text in messages:
+        try:
+            admission = speech_manager.enqueue(text, priority)
+        except QueueFull as e:
+            # Later messages would be rejected too; report what got in
+            result["rejected"] = len(messages) - result["count"]
+            if not result["count"]:
+                return queue_full(e)
+            result["retry_after_s"] = round(e.retry_after or 0.0, 2)
+            break
+        result["count"] += 1
+        result.update(depth=admission["depth"], estimated_start_s=admission["estimated_start_s"])
+    return result, 200
+
+
+def interrupt(speech_manager: SpeechManager, data):
+    """Stop speaking now: {"text": "optional message to say instead", "flush": true}"""
+    text = data.get("text")
+    if text is not None and not isinstance(text, str):
+        return {"error": "'text' must be a string"}, 400
+    try:
+        return speech_manager.interrupt(text, flush=bool(data.get("flush", True))), 200
+    except QueueFull as e:
+        return queue_full(e)
+
+
+def prewarm(speech_manager: SpeechManager, data):
+    phrases = data.get("phrases")
+    if not isinstance(phrases, list) or not all(isinstance(p, str) for p in phrases):
+        return {"error": "Missing 'phrases' list"}, 400
+    speech_manager.prewarm(phrases)
+    return {"status": "prewarming", "count": len(phrases)}, 200
+
+
+def tts_cache_stats(speech_manager: SpeechManager, data=None):
+    return speech_manager.tts_cache.stats, 200
+
+
+def stats(speech_manager: SpeechManager, data=None):
+    return speech_manager.stats, 200
+
+
+def metrics_text(speech_manager: SpeechManager, data=None):
+    """Prometheus text format; the servers send str payloads as metrics.CONTENT_TYPE"""
+    return metrics.render(), 200
+
+
+class MessageStream:
+    """
+    NDJSON streaming ingestion, one line at a time:
+        {"text": "Hello there, "}
+        {"text": "how can I help?"}
+        {"end": true}
+    """
+
+    def __init__(self, speech_manager: SpeechManager, priority: int = NORMAL):
+        # Raises QueueFull
+        self.stream = speech_manager.open_stream(priority)
+        self.ended = False
+
+    def line(self, raw):
+        """Feed one line; returns an error (payload, status) or None"""
+        raw = raw.strip()
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return {"error": "Invalid JSON line"}, 400
+        if not isinstance(data, dict):
+            return {"error": "Each line must be a JSON object"}, 400
+        text = data.get("text")
+        if text is not None and not isinstance(text, str):
+            return {"error": "'text' must be a string"}, 400
+        if text:
+            self.feed(text)
+        if data.get("end"):
+            self.ended = True
+        return None
+
+    def feed(self, text):
+        self.stream.feed(text)
+
+    def finish(self):
+        # A dropped connection still ends the utterance so the queue can move on
+        self.stream.close()
+        return {"status": "streamed" if self.ended else "closed without end marker",
+                "chunks": self.stream.utterance.total_chunks}, 200
+
+
+# (method, path) -> handler(speech_manager, data)
+ROUTES = {
+    ("POST", "/post-message"): post_message,
+    ("POST", "/post-messages"): post_messages,
+    ("POST", "/interrupt"): interrupt,
+    ("POST", "/prewarm"): prewarm,
+    ("GET", "/tts-cache"): tts_cache_stats,
+    ("GET", "/stats"): stats,
+    ("GET", "/metrics"): metrics_text,
+}
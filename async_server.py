@@ -0,0 +1,306 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosedOK
+import api
+import metrics
+from constants import MESSAGE_STREAM_IDLE_SECONDS
+from speech_manager import SpeechManager
+
+MAX_BODY = 1024 * 1024
+
+
+class BadBody(ValueError):
+    """Unreadable or oversized request body; answered with `status`, then the connection is closed"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncWebServer:
+    """
+    asyncio replacement for the Flask dev server, on its own event-loop thread.
+
+    HTTP (port): the same API as web_server.py over persistent HTTP/1.1
+    connections, with chunked request bodies for /stream-message and
+    /post-messages for batches.
+
+    With several avatars, /<name>/post-message etc. (and ws://host:ws_port/<name>)
+    address one of them; unprefixed paths go to the first. WebSocket handshakes
+    for any other path are refused with 404.
+
+    WebSocket (ws_port): one JSON object per frame, answered in order:
+        {"type": "message", "text": "...", "priority": "urgent", "key": "..."}
+        {"type": "messages", "messages": ["...", "..."]}
+        {"type": "stream", "text": "..."}      # appends to this connection's stream
+        {"type": "end"}                        # closes it
+        {"type": "interrupt", "text": "...", "flush": true}
+        {"type": "stats"}
+    """
+
+    def __init__(self, speech_managers, host="0.0.0.0", port=5001, ws_port=5002):
+        # A SpeechManager, or {name: SpeechManager} for several avatars
+        if isinstance(speech_managers, SpeechManager):
+            speech_managers = {speech_managers.name: speech_managers}
+        self.speech_managers = dict(speech_managers)
+        self.speech_manager = next(iter(self.speech_managers.values()))
+        self.host = host
+        self.port = port
+        self.ws_port = ws_port
+        self.loop = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=lambda: asyncio.run(self._serve()), name="async-web-server", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        http_server = await asyncio.start_server(self._handle_http, self.host, self.port)
+        async with serve(self._handle_ws, self.host, self.ws_port, process_request=self._check_ws_path):
+            self._ready.set()
+            print(f"Async server on http://{self.host}:{self.port} and ws://{self.host}:{self.ws_port}")
+            async with http_server:
+                await http_server.serve_forever()
+
+    # ---- HTTP ----
+
+    async def _handle_http(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, {"error": "Bad request"}, 400, keep_alive=False)
+                    break
+                headers = await self._read_headers(reader)
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close" if version == "HTTP/1.1" else connection == "keep-alive")
+
+                path, _, query = path.partition("?")
+                speech_manager, path = self._avatar(path)
+                try:
+                    if (method, path) == ("POST", "/stream-message"):
+                        payload, status = await self._stream_message(speech_manager, reader, headers,
+                                                                     dict(parse_qsl(query)))
+                    else:
+                        body = b"".join([piece async for piece in self._body(reader, headers)])
+                        payload, status = self._route(speech_manager, method, path, body)
+                except BadBody as e:
+                    # The rest of the body is still on the connection: answer, then close it
+                    await self._respond(writer, {"error": str(e)}, e.status, keep_alive=False)
+                    await self._discard(reader)
+                    break
+                await self._respond(writer, payload, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _avatar(self, path):
+        """'/<name>/rest' → (that avatar's SpeechManager, '/rest'); other paths go to the first avatar"""
+        name, _, rest = path.lstrip("/").partition("/")
+        if name in self.speech_managers:
+            return self.speech_managers[name], "/" + rest
+        return self.speech_manager, path
+
+    def _route(self, speech_manager, method, path, body):
+        handler = api.ROUTES.get((method, path))
+        if handler is None:
+            known = any(p == path for _, p in api.ROUTES)
+            return {"error": "Method not allowed" if known else "Not found"}, 405 if known else 404
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return handler(speech_manager, data)
+
+    async def _stream_message(self, speech_manager, reader, headers, args):
+        priority = api.priority_of(args)
+        try:
+            if priority is None:
+                raise ValueError("Invalid 'priority'")
+            stream = api.MessageStream(speech_manager, priority)
+        except (ValueError, api.QueueFull) as e:
+            # The body is still on the connection; drain it so keep-alive stays in sync
+            async for _ in self._body(reader, headers):
+                pass
+            return api.queue_full(e) if isinstance(e, api.QueueFull) else ({"error": str(e)}, 400)
+        error = None
+        buffered = b""
+        body = self._body(reader, headers)
+        try:
+            while True:
+                try:
+                    piece = await asyncio.wait_for(anext(body), MESSAGE_STREAM_IDLE_SECONDS)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    # The producer stalled: end the message so the queue behind it can play
+                    raise BadBody(f"No data for {MESSAGE_STREAM_IDLE_SECONDS}s", 408) from None
+                buffered += piece
+                *lines, buffered = buffered.split(b"\n")
+                for line in lines:
+                    error = error or stream.line(line)
+            if not error and buffered:
+                error = stream.line(buffered)
+        finally:
+            result = stream.finish()
+        return error or result
+
+    @staticmethod
+    async def _read_headers(reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    async def _body(reader, headers):
+        """Yield the request body as it arrives (Content-Length or chunked), at most MAX_BODY bytes"""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            total = 0
+            while True:
+                try:
+                    size = int((await reader.readline()).split(b";", 1)[0], 16)
+                except ValueError:
+                    raise BadBody("Invalid chunk size") from None
+                if size < 0:
+                    raise BadBody("Invalid chunk size")
+                if size == 0:
+                    await AsyncWebServer._read_headers(reader)      # trailers
+                    return
+                total += size
+                if total > MAX_BODY:
+                    raise BadBody("Body too large", 413)
+                yield await reader.readexactly(size)
+                await reader.readline()
+        else:
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                raise BadBody("Invalid Content-Length") from None
+            if length < 0:
+                raise BadBody("Invalid Content-Length")
+            if length > MAX_BODY:
+                raise BadBody("Body too large", 413)
+            if length:
+                yield await reader.readexactly(length)
+
+    @staticmethod
+    async def _discard(reader, timeout=1.0):
+        """Drop what the client is still sending (up to MAX_BODY), so closing doesn't reset
+        the connection before it has read the error response"""
+        discarded = 0
+        try:
+            while discarded <= MAX_BODY:
+                data = await asyncio.wait_for(reader.read(65536), timeout)
+                if not data:
+                    return
+                discarded += len(data)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    async def _respond(writer, payload, status, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), metrics.CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8") + b"\n", "application/json"
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # ---- WebSocket ----
+
+    def _check_ws_path(self, connection, request):
+        """Refuse the handshake unless the path is / or /<name> of a hosted avatar"""
+        _, rest = self._avatar(request.path.partition("?")[0])
+        if rest != "/":
+            return connection.respond(HTTPStatus.NOT_FOUND, "Unknown avatar\n")
+        return None
+
+    async def _handle_ws(self, websocket):
+        speech_manager, _ = self._avatar(websocket.request.path)
+        stream = None
+        try:
+            while True:
+                try:
+                    # Only an open stream has an idle limit; the connection itself may sit idle
+                    frame = await asyncio.wait_for(websocket.recv(),
+                                                   MESSAGE_STREAM_IDLE_SECONDS if stream is not None else None)
+                except ConnectionClosedOK:
+                    break
+                except asyncio.TimeoutError:
+                    payload, _ = stream.finish()
+                    stream = None
+                    payload["error"] = f"Stream ended after {MESSAGE_STREAM_IDLE_SECONDS}s without data"
+                    await websocket.send(json.dumps(payload))
+                    continue
+                try:
+                    data = json.loads(frame)
+                except ValueError:
+                    await websocket.send(json.dumps({"error": "Invalid JSON"}))
+                    continue
+                kind = data.get("type") if isinstance(data, dict) else None
+
+                if kind == "stream":
+                    text = data.get("text", "")
+                    try:
+                        if not isinstance(text, str):
+                            raise ValueError("'text' must be a string")
+                        if stream is None:
+                            priority = api.priority_of(data)
+                            if priority is None:
+                                raise ValueError("Invalid 'priority'")
+                            stream = api.MessageStream(speech_manager, priority)
+                    except api.QueueFull as e:
+                        payload, _ = api.queue_full(e)
+                    except ValueError as e:
+                        payload = {"error": str(e)}
+                    else:
+                        stream.feed(text)
+                        payload = {"status": "streaming"}
+                elif kind == "end":
+                    if stream is None:
+                        payload = {"error": "No open stream"}
+                    else:
+                        stream.ended = True
+                        payload, _ = stream.finish()
+                        stream = None
+                elif kind == "message":
+                    payload, _ = api.post_message(speech_manager, data)
+                elif kind == "messages":
+                    payload, _ = api.post_messages(speech_manager, data)
+                elif kind == "interrupt":
+                    payload, _ = api.interrupt(speech_manager, data)
+                elif kind == "stats":
+                    payload, _ = api.stats(speech_manager)
+                else:
+                    payload = {"error": f"Unknown type: {kind}"}
+                await websocket.send(json.dumps(payload))
+        finally:
+            if stream is not None:
+                stream.finish()
+
+
+def create_async_web_server(speech_managers, port=5001, ws_port=5002):
+    return AsyncWebServer(speech_managers, port=port, ws_port=ws_port).start()
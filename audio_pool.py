@@ -0,0 +1,91 @@
+"""
+Audio post-processing (decode, time-stretch, resample to the mixer format) in
+worker processes, so it never holds the render process's GIL.
+
+Workers write the finished PCM into a shared-memory block and return only its
+name and size; the caller copies it out once and frees the block, instead of
+the PCM being pickled through the result pipe.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import audio_utils
+import time_stretch
+
+
+def postprocess(data: bytes, format: str, speed: float, fmt) -> bytes:
+    """Encoded audio → time-stretched PCM in mixer format (frame_rate, sample_width, channels)"""
+    audio = audio_utils.decode(data, format=format)
+    audio = time_stretch.speedup(audio, speed)
+    return audio_utils.to_mixer_pcm(audio, fmt)
+
+
+def _postprocess_shared(data, format, speed, fmt):
+    pcm = postprocess(data, format, speed, fmt)
+    block = shared_memory.SharedMemory(create=True, size=max(len(pcm), 1))
+    block.buf[:len(pcm)] = pcm
+    block.close()
+    return block.name, len(pcm)
+
+
+def _init_worker(niceness):
+    # Background work: on a busy CPU the render process should win
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+    # Exit with the render process even if it dies without shutting the pool down
+    parent = multiprocessing.parent_process()
+    threading.Thread(target=lambda: (parent.join(), os._exit(0)), daemon=True).start()
+
+
+def _ready():
+    return True
+
+
+class AudioProcessPool:
+    """
+    postprocess() in a pool of worker processes.
+
+    Workers are spawned rather than forked (the render process has SDL and
+    synthesis threads running), run at a lower scheduling priority, and are
+    started up front so the first message doesn't wait for interpreters to boot.
+    """
+
+    def __init__(self, workers: int = 2, niceness: int = 10):
+        self.workers = workers
+        self.niceness = niceness
+        self._executor = self._start()
+
+    def _start(self):
+        executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(self.niceness,))
+        self._booting = [executor.submit(_ready) for _ in range(self.workers)]
+        return executor
+
+    def wait_ready(self):
+        """Block until the workers have started"""
+        for future in self._booting:
+            future.result()
+
+    def postprocess(self, data: bytes, format: str, speed: float, fmt) -> bytes:
+        """Same as the module-level postprocess(); blocks the calling thread, not the GIL"""
+        executor = self._executor
+        try:
+            name, size = executor.submit(_postprocess_shared, data, format, speed, fmt).result()
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed by the OS): do this chunk here and replace the pool
+            print(f"[AUDIO POOL ERROR] {e}")
+            if self._executor is executor:
+                self._executor = self._start()
+            return postprocess(data, format, speed, fmt)
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            return bytes(block.buf[:size])
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,28 @@
+import io
+import pygame.mixer
+from pydub import AudioSegment
+
+
+def mixer_format():
+    """(frame_rate, sample_width, channels) the mixer was opened with"""
+    frequency, size, channels = pygame.mixer.get_init()
+    return frequency, abs(size) // 8, channels
+
+
+def decode(data: bytes, format: str = "mp3") -> AudioSegment:
+    """Decode an in-memory audio file to PCM"""
+    return AudioSegment.from_file(io.BytesIO(data), format=format)
+
+
+def to_mixer_pcm(segment: AudioSegment, fmt=None) -> bytes:
+    """Convert decoded audio to raw PCM in the mixer's sample format"""
+    frame_rate, sample_width, channels = fmt or mixer_format()
+    segment = (segment.set_frame_rate(frame_rate)
+                      .set_channels(channels)
+                      .set_sample_width(sample_width))
+    return segment.raw_data
+
+
+def pcm_to_sound(pcm: bytes) -> pygame.mixer.Sound:
+    """Wrap mixer-format PCM in a Sound without touching the disk"""
+    return pygame.mixer.Sound(buffer=pcm)
@@ -0,0 +1,149 @@
+"""
+Several avatars in one process.
+
+Every avatar gets a viewport of the window, its own message queue and mixer
+channel, and /<name>/... routes on the web server. The frame store, synthesis
+workers, audio processes, TTS cache and backend are shared, so N displays on
+one machine cost one process instead of N. The synthesis workers take turns
+between avatars, so a long backlog on one cannot starve the others.
+"""
+import threading
+import time
+import pygame
+import metrics
+from audio_pool import AudioProcessPool
+from avatar_manager import AvatarManager
+from frame_store import FrameStore
+from speech_manager import SpeechManager, SPEECH_END_EVENT
+from synthesis_scheduler import SynthesisScheduler
+from tts_backends import create_backend
+from tts_cache import TTSCache
+from constants import (AVATARS, FPS, IDLE_ANIMATION_SECONDS, EVENT_POLL_SECONDS, DIRTY_RECT_RENDERING,
+                       FRAME_MEMORY_BUDGET_MB, SYNTHESIS_WORKERS, AUDIO_PROCESS_WORKERS,
+                       TTS_BACKEND, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES, TTS_HEDGE_PERCENTILE)
+
+
+class HostedAvatar:
+    """One avatar's animation and speech, plus its main-loop state"""
+
+    def __init__(self, name, avatar_manager: AvatarManager, speech_manager: SpeechManager):
+        self.name = name
+        self.avatar_manager = avatar_manager
+        self.speech_manager = speech_manager
+        self.is_talking = False
+        self.animating = True
+        self.last_speech = time.monotonic()
+        self.speech_deadline = None
+
+
+class AvatarHost:
+    def __init__(self, avatars=AVATARS):
+        """avatars: AVATARS-style specs; the display mode must already be set"""
+        budget = FRAME_MEMORY_BUDGET_MB and int(FRAME_MEMORY_BUDGET_MB * 1024 * 1024)
+        self.frame_store = FrameStore(budget)
+        self.scheduler = SynthesisScheduler(SYNTHESIS_WORKERS)
+        self.audio_processes = AudioProcessPool(AUDIO_PROCESS_WORKERS) if AUDIO_PROCESS_WORKERS else None
+        self.tts_cache = TTSCache()
+        self.backend = create_backend(TTS_BACKEND, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES,
+                                      TTS_HEDGE_PERCENTILE)
+        # One wake-up for every avatar's speech manager, so the loop sleeps in one place
+        self.wakeup = threading.Event()
+
+        self.avatars = []
+        for channel, spec in enumerate(avatars):
+            spec = dict(spec)
+            name = spec.pop("name")
+            avatar_manager = AvatarManager(frame_store=self.frame_store, **spec)
+            speech_manager = SpeechManager(avatar_manager, tts_cache=self.tts_cache, scheduler=self.scheduler,
+                                           backend=self.backend, audio_processes=self.audio_processes,
+                                           name=name, channel=channel, wakeup=self.wakeup)
+            self.avatars.append(HostedAvatar(name, avatar_manager, speech_manager))
+
+    @property
+    def speech_managers(self):
+        """{name: SpeechManager}, in AVATARS order, for the web servers"""
+        return {avatar.name: avatar.speech_manager for avatar in self.avatars}
+
+    def prewarm(self, phrases):
+        # Cache keys depend on each avatar's voice and chunking, so warm through every
+        # avatar; avatars that would produce the same keys share one pass through the shared cache
+        warmed = set()
+        for avatar in self.avatars:
+            sm = avatar.speech_manager
+            voice = (sm.lang, sm.tld, sm.playback_speed, sm.chunk_size, sm.backend.name)
+            if voice not in warmed:
+                warmed.add(voice)
+                sm.prewarm(phrases)
+
+    def run(self, screen):
+        """Main loop until the window is closed"""
+        # Sleep until something is due instead of ticking at a fixed rate.
+        # pygame.event.wait() polls every millisecond internally, so the loop sleeps on
+        # the speech managers' shared wake-up instead and pumps window events when it wakes.
+        frame_timer = metrics.FrameTimer(1.0 / FPS)
+        running = True
+
+        while running:
+            now = time.monotonic()
+            timeout = EVENT_POLL_SECONDS
+            for avatar in self.avatars:
+                if avatar.is_talking:
+                    avatar.last_speech = now
+                # Idle power mode: after a while without speech the idle animation holds still
+                avatar.animating = (IDLE_ANIMATION_SECONDS is None or avatar.is_talking
+                                    or now - avatar.last_speech < IDLE_ANIMATION_SECONDS)
+                if avatar.animating:
+                    timeout = min(timeout, avatar.avatar_manager.next_update(avatar.is_talking) / 1000)
+                avatar.speech_deadline = avatar.speech_manager.next_deadline()
+                if avatar.speech_deadline is not None:
+                    timeout = min(timeout, avatar.speech_deadline)
+                mouth_change = avatar.speech_manager.next_mouth_change()
+                if mouth_change is not None:
+                    timeout = min(timeout, mouth_change)
+            woken = self.wakeup.wait(timeout)
+            self.wakeup.clear()
+
+            frame_timer.start()
+            speech_ended = False
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.WINDOWEXPOSED:
+                    for avatar in self.avatars:
+                        avatar.avatar_manager.invalidate()
+                elif event.type == SPEECH_END_EVENT:
+                    speech_ended = True
+            frame_timer.mark("events")
+
+            # Only when there is something to do: a new message, a finished chunk, audio that ended
+            for avatar in self.avatars:
+                deadline = avatar.speech_deadline
+                if woken or speech_ended or (deadline is not None and deadline <= timeout):
+                    avatar.speech_manager.process_queue()
+                avatar.is_talking = avatar.speech_manager.is_speaking
+            frame_timer.mark("process_queue")
+            for avatar in self.avatars:
+                if avatar.animating or avatar.is_talking:
+                    avatar.avatar_manager.update(avatar.is_talking, mouth=avatar.speech_manager.mouth_level())
+            frame_timer.mark("update")
+
+            if DIRTY_RECT_RENDERING:
+                dirty = []
+                for avatar in self.avatars:
+                    dirty += avatar.avatar_manager.draw_dirty(screen, avatar.is_talking)
+                frame_timer.mark("draw")
+                if dirty:
+                    pygame.display.update(dirty)
+            else:
+                screen.fill((0, 0, 0))
+                for avatar in self.avatars:
+                    avatar.avatar_manager.draw(screen, avatar.is_talking)
+                frame_timer.mark("draw")
+                pygame.display.flip()
+            frame_timer.mark("flip")
+            frame_timer.finish()
+
+        if DIRTY_RECT_RENDERING:
+            for avatar in self.avatars:
+                print(f"{avatar.name}: frames presented: {avatar.avatar_manager.frames_presented}, "
+                      f"skipped: {avatar.avatar_manager.frames_skipped}")
@@ -1,29 +1,66 @@
 import pygame
+import lip_sync
+import metrics
 from character_animation import CharacterAnimation
-from constants import WIDTH, HEIGHT, FROM_CENTER
+from frame_store import FrameStore
+from sprite_bundle import SpriteBundle
+from constants import WIDTH, HEIGHT, FROM_CENTER, FRAME_MEMORY_BUDGET_MB, LIP_SYNC
 
 class AvatarManager:
     def __init__(self, character_name="neeko", frames_count=4, scale=0.5, is_front_only=True,
-                 speed_talking=50, speed_idle=100):
+                 speed_talking=50, speed_idle=100, precomposite=False, frame_store=None, lazy=False,
+                 viewport=None, distance_from_center=FROM_CENTER):
+        # Frames are deduplicated in a store that may be shared between avatars
+        if frame_store is None:
+            budget = FRAME_MEMORY_BUDGET_MB and int(FRAME_MEMORY_BUDGET_MB * 1024 * 1024)
+            frame_store = FrameStore(budget)
+        self.frame_store = frame_store
+
+        # Prefer a prebaked sprite bundle (see sprite_bundle.py) over decoding PNGs.
+        # It stays mapped so evicted or lazy frames can be reloaded cheaply.
+        self.bundle = SpriteBundle.open_for(character_name, scale, frames_count=frames_count)
+        self.character_name = character_name
+        animation_args = dict(scale=scale, character_name=character_name, is_front_only=is_front_only,
+                              frame_count=frames_count, bundle=self.bundle, frame_store=frame_store, lazy=lazy)
         self.states = {
-            'idle': CharacterAnimation('idle', speed_idle, scale=scale, character_name=character_name,
-                                       is_front_only=is_front_only, frame_count=frames_count),
-            'talking': CharacterAnimation('talking', speed_talking, scale=scale, character_name=character_name, 
-                                          is_front_only=is_front_only, frame_count=frames_count),
+            'idle': CharacterAnimation('idle', speed_idle, **animation_args),
+            'talking': CharacterAnimation('talking', speed_talking, **animation_args),
         }
         self.current_state = 'idle'
+        # Talking frame per lip-sync level, most closed mouth first
+        self.mouth_frames = lip_sync.mouth_frames(self.states['talking'], self.states['idle']) if LIP_SYNC else None
+        self.lip_synced = False
         
-        # Calculate center and positions
-        width=WIDTH
-        height=HEIGHT
-        distance_from_center = FROM_CENTER
-        self.center_x = width // 2
-        self.center_y = height // 2
+        # Calculate center and positions within the viewport (the whole window by default)
+        self.viewport = pygame.Rect(viewport or (0, 0, WIDTH, HEIGHT))
+        self.center_x, self.center_y = self.viewport.center
         self.distance = distance_from_center
         
         # Configure faces with dynamic positioning
         self.faces = self._configure_faces()
 
+        # Rotate every frame once up front; draw() only blits
+        angles = {face["direction"]: face["angle"] for face in self.faces}
+        for animation in self.states.values():
+            animation.prerotate(angles)
+
+        # Change tracking for dirty-rectangle rendering
+        self._last_drawn = None
+        self._last_rects = []
+        self._full_redraw = True     # first frame and after invalidate(): repaint the whole viewport
+        self.frames_presented = 0
+        self.frames_skipped = 0
+        self._presented_metric = metrics.FRAMES.labels("presented")
+        self._skipped_metric = metrics.FRAMES.labels("skipped")
+
+        # Optionally flatten the four faces into one surface per (state, frame)
+        self.precomposite = precomposite
+        self._composite_origins = {}
+        if precomposite and not lazy:
+            for state, animation in self.states.items():
+                for i in range(animation.frame_count):
+                    self._composite(state, i)
+
     def _configure_faces(self):
         """Generate face positions based on distance from center"""
         return [
@@ -59,22 +96,106 @@ class AvatarManager:
             raise ValueError(f"Invalid state: {state}")
         self.current_state = state
 
-    def update(self, is_talking):
-        """Update animations based on speaking state"""
-        if is_talking:
-            self.states['talking'].update()
+    def update(self, is_talking, now=None, mouth=None):
+        """Update animations based on speaking state; now (ms) overrides the pygame clock"""
+        self.lip_synced = is_talking and mouth is not None and bool(self.mouth_frames)
+        if self.lip_synced:
+            # Lip sync: the level at the playback position picks the frame directly
+            self.states['talking'].current_frame = self.mouth_frames[mouth]
+        elif is_talking:
+            self.states['talking'].update(now)
         else:
-            self.states['idle'].update()
+            self.states['idle'].update(now)
+
+    def next_update(self, is_talking, now=None):
+        """Milliseconds until the animation for this speaking state changes frame"""
+        if is_talking and self.lip_synced:
+            return float("inf")      # paced by the speech manager's lip-sync steps instead
+        return self.states['talking' if is_talking else 'idle'].next_update(now)
 
     def draw(self, screen, is_talking):
-        """Draw all faces"""
+        """Draw all faces, clipped to the viewport"""
+        state = 'talking' if is_talking else 'idle'
+        animation = self.states[state]
+        clip = screen.get_clip()
+        screen.set_clip(self.viewport.clip(clip))
+        if self.precomposite:
+            surface, topleft = self._composite(state, animation.current_frame)
+            screen.blit(surface, topleft)
+        else:
+            for face in self.faces:
+                frame = animation.get_rotated_frame(face["direction"])
+                self._draw_centered(screen, frame, face["pos"])
+        screen.set_clip(clip)
+
+    def draw_dirty(self, screen, is_talking, background=(0, 0, 0)):
+        """Redraw only when the state or frame changed; return the rects to present"""
         state = 'talking' if is_talking else 'idle'
-        for face in self.faces:
-            frame = self.states[state].get_frame(face["direction"])
-            self._draw_rotated(screen, frame, face["pos"], face["angle"])
+        drawn = (state, self.states[state].current_frame)
+        if drawn == self._last_drawn and not self._full_redraw:
+            self.frames_skipped += 1
+            self._skipped_metric.inc()
+            return []
 
-    def _draw_rotated(self, screen, img, pos, angle):
-        """Draw rotated image"""
-        img = pygame.transform.rotate(img, angle)
+        rects = self._face_rects(state)
+        if self._full_redraw:
+            dirty = [self.viewport]
+            self._full_redraw = False
+        else:
+            dirty = [rect.union(old).clip(self.viewport) for rect, old in zip(rects, self._last_rects)]
+        for rect in dirty:
+            screen.fill(background, rect)
+        self.draw(screen, is_talking)
+
+        self._last_drawn = drawn
+        self._last_rects = rects
+        self.frames_presented += 1
+        self._presented_metric.inc()
+        return dirty
+
+    def invalidate(self):
+        """Force the next draw_dirty() to repaint the whole viewport, e.g. after the window was exposed"""
+        self._full_redraw = True
+
+    def _face_rects(self, state):
+        """Screen rects covered by the current frame of a state"""
+        animation = self.states[state]
+        if self.precomposite:
+            surface, topleft = self._composite(state, animation.current_frame)
+            return [surface.get_rect(topleft=topleft)]
+        return [animation.get_rotated_frame(face["direction"]).get_rect(center=face["pos"])
+                for face in self.faces]
+
+    def _draw_centered(self, screen, img, pos):
+        """Draw pre-rotated image centered on pos"""
         rect = img.get_rect(center=pos)
-        screen.blit(img, rect)
\ No newline at end of file
+        screen.blit(img, rect)
+
+    def _composite(self, state, frame_idx):
+        """Surface and position of the four rotated faces of a frame, blitted together"""
+        key = (self.character_name, "composite", state, self.states[state].scale,
+               self.center_x, self.center_y, self.distance, frame_idx)
+        surface = self.frame_store.get(key, lambda: self._build_composite(state, frame_idx))
+        origin = self._composite_origins.get((state, frame_idx))
+        if origin is None:
+            # The store can hold a composite built by another avatar sharing it
+            bounds, _ = self._composite_bounds(state, frame_idx)
+            origin = self._composite_origins[(state, frame_idx)] = bounds.topleft
+        return surface, origin
+
+    def _composite_bounds(self, state, frame_idx):
+        """(bounding rect of the faces, rect of each face) on screen"""
+        animation = self.states[state]
+        rects = [animation.rotated_frame(face["direction"], frame_idx).get_rect(center=face["pos"])
+                 for face in self.faces]
+        return rects[0].unionall(rects[1:]), rects
+
+    def _build_composite(self, state, frame_idx):
+        animation = self.states[state]
+        bounds, rects = self._composite_bounds(state, frame_idx)
+        surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        for face, rect in zip(self.faces, rects):
+            img = animation.rotated_frame(face["direction"], frame_idx)
+            surface.blit(img, rect.move(-bounds.x, -bounds.y))
+        self._composite_origins[(state, frame_idx)] = bounds.topleft
+        return surface
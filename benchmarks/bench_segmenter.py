@@ -0,0 +1,64 @@
+"""
+Chunking micro-benchmark: the previous regex chunker in SpeechManager.speak
+vs text_segmenter on multi-kilobyte inputs.
+
+    python -m benchmarks.bench_segmenter
+"""
+import argparse
+import re
+import text_segmenter
+from benchmarks.common import best_of
+
+SENTENCE = ("The quarterly report shows revenue of $4.2 million, up 12% from last year; "
+            "Dr. Lee said the U.S. market grew fastest... Would you like the details? ")
+
+
+def legacy_split(text, chunk_size=10):
+    """The chunker speak() used before text_segmenter, kept for comparison"""
+    words = text.split()
+    chunks = []
+    i = 0
+    size = chunk_size
+    SEPARATORS = r"[.,;:?!]"
+    LAST_SEPARATOR_REGEX = SEPARATORS + r"(?!.*" + SEPARATORS + ")"
+    while i < len(words):
+        end = min(i + size, len(words))
+        chunk_words = words[i:end]
+        chunk_text = " ".join(chunk_words)
+        match = re.search(LAST_SEPARATOR_REGEX, chunk_text)
+        if match:
+            punct_index = chunk_text[:match.end()].count(" ")
+            end = min(i + punct_index + 1, i + size)
+            chunk_words = words[i:end]
+        chunks.append(" ".join(chunk_words))
+        i = end
+        size *= 2
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    target = lambda idx: min(10 * 2 ** idx, 40)
+    print(f"{'KB':>6} {'legacy ms':>10} {'segment ms':>11} {'stream ms':>10} {'MB/s':>7} {'chunks':>7} {'max words':>10}")
+    for kb in (1, 5, 10, 50):
+        text = (SENTENCE * (kb * 1024 // len(SENTENCE) + 1))[:kb * 1024]
+        legacy_s = best_of(lambda: legacy_split(text), args.repeat)
+        segment_s = best_of(lambda: text_segmenter.segment(text, target), args.repeat)
+
+        def streamed():
+            segmenter = text_segmenter.SentenceSegmenter(target)
+            for i in range(0, len(text), 16):       # token-sized pieces
+                segmenter.feed(text[i:i + 16])
+            segmenter.flush()
+        stream_s = best_of(streamed, args.repeat)
+
+        chunks = text_segmenter.segment(text, target)
+        print(f"{kb:6d} {legacy_s * 1000:10.2f} {segment_s * 1000:11.2f} {stream_s * 1000:10.2f} "
+              f"{len(text) / segment_s / 1e6:7.1f} {len(chunks):7d} {max(len(c.split()) for c in chunks):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Time-stretch benchmark: pydub AudioSegment.speedup vs the NumPy WSOLA stage.
+
+    python -m benchmarks.bench_time_stretch
+"""
+import argparse
+import audio_utils
+import time_stretch
+from tts_backends import ToneBackend
+from benchmarks.common import TEXT, best_of
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backend = ToneBackend()
+    print(f"{'audio s':>8} {'pydub s':>9} {'wsola s':>9} {'pydub xRT':>10} {'wsola xRT':>10} {'speedup':>8}")
+    for repeats in (1, 4, 16):
+        result = backend.synthesize(TEXT * repeats, "en", "us")
+        segment = audio_utils.decode(result.data, result.format)
+        duration = len(segment) / 1000
+        pydub_s = best_of(lambda: segment.speedup(playback_speed=args.rate), args.repeat)
+        wsola_s = best_of(lambda: time_stretch.speedup(segment, args.rate), args.repeat)
+        print(f"{duration:8.1f} {pydub_s:9.4f} {wsola_s:9.4f} {duration / pydub_s:10.0f} "
+              f"{duration / wsola_s:10.0f} {pydub_s / wsola_s:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Helpers shared by the benchmark scripts"""
+import time
+
+TEXT = ("Welcome to the store, my name is Clerk. I can help you find products, "
+        "check prices, and answer questions about opening hours. ")
+
+
+def best_of(fn, repeat):
+    """Fastest of `repeat` runs of fn, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
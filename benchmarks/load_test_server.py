@@ -0,0 +1,138 @@
+"""
+Ingestion server load test: Flask dev server vs the asyncio server.
+
+Each server runs in its own process with a real SpeechManager (offline tone
+backend, nothing played). Concurrent clients POST /post-message over
+persistent connections; the asyncio server is also measured with batched
+requests and over WebSocket.
+
+    python -m benchmarks.load_test_server --requests 4000 --clients 16
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+
+HTTP_PORT = 5301
+WS_PORT = 5302
+
+
+def run_server(kind):
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import logging
+    from speech_manager import SpeechManager
+    from tts_backends import ToneBackend
+    from tts_cache import TTSCache
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    # Daemonic processes can't start the audio process pool; ingestion doesn't need it
+    speech_manager = SpeechManager(tts_cache=TTSCache(disk_dir=None), backend=ToneBackend(), audio_workers=0)
+    if kind == "flask":
+        from web_server import create_web_server
+        create_web_server(speech_manager, port=HTTP_PORT)
+    else:
+        from async_server import create_async_web_server
+        create_async_web_server(speech_manager, port=HTTP_PORT, ws_port=WS_PORT)
+    while True:
+        time.sleep(1)
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/stats")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def http_load(total, clients, batch):
+    latencies = []
+    lock = threading.Lock()
+    per_client = total // clients // batch
+
+    def client(cid):
+        conn = http.client.HTTPConnection("127.0.0.1", HTTP_PORT)
+        mine = []
+        for i in range(per_client):
+            if batch == 1:
+                path, body = "/post-message", {"text": f"client {cid} message {i}"}
+            else:
+                path, body = "/post-messages", {"messages": [f"client {cid} message {i}.{j}" for j in range(batch)]}
+            start = time.perf_counter()
+            conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+            conn.getresponse().read()
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies, per_client * clients * batch
+
+
+def ws_load(total, clients):
+    from websockets.asyncio.client import connect
+    latencies = []
+
+    async def client(cid):
+        async with connect(f"ws://127.0.0.1:{WS_PORT}") as ws:
+            for i in range(total // clients):
+                start = time.perf_counter()
+                await ws.send(json.dumps({"type": "message", "text": f"client {cid} message {i}"}))
+                await ws.recv()
+                latencies.append(time.perf_counter() - start)
+
+    async def run():
+        await asyncio.gather(*(client(c) for c in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start, latencies, total // clients * clients
+
+
+def report(name, elapsed, latencies, messages):
+    latencies.sort()
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    print(f"{name:<22} {messages / elapsed:10.0f} {len(latencies) / elapsed:10.0f} "
+          f"{statistics.median(latencies) * 1000:9.2f} {p99 * 1000:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'server':<22} {'msgs/s':>10} {'reqs/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for kind in ("flask", "asyncio"):
+        server = multiprocessing.Process(target=run_server, args=(kind,), daemon=True)
+        server.start()
+        try:
+            wait_for_port(HTTP_PORT)
+            report(f"{kind} http", *http_load(args.requests, args.clients, 1))
+            if kind == "asyncio":
+                report(f"{kind} http batch={args.batch}", *http_load(args.requests, args.clients, args.batch))
+                report(f"{kind} websocket", *ws_load(args.requests, args.clients))
+        finally:
+            # SDL turns SIGTERM into a pygame QUIT event, so terminate() would never stop it
+            server.kill()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
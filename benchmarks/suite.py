@@ -0,0 +1,313 @@
+"""
+Headless benchmark suite: sprite loading, drawing, chunking, audio
+post-processing, frame times while synthesizing and message-to-first-audio
+latency (whole-chunk vs streamed playback), written as JSON.
+
+Runs on SDL's dummy video/audio drivers with the offline tone TTS backend, so
+results don't depend on a display, a sound card or the network. Every result
+is "lower is better"; with --baseline, anything slower than the baseline by
+more than --threshold is reported and the exit status is 1.
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --out new.json --baseline bench.json
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent import futures
+import pygame
+import audio_utils
+import time_stretch
+from avatar_manager import AvatarManager
+from character_animation import CharacterAnimation
+from constants import WIDTH, HEIGHT, FPS, PLAYBACK_SPEED, AUDIO_PROCESS_WORKERS
+from frame_store import FrameStore
+from speech_manager import SpeechManager
+from sprite_bundle import SpriteBundle, compile_bundle
+from tts_backends import TTSBackend, ToneBackend
+from tts_cache import TTSCache
+from benchmarks.common import TEXT, best_of
+
+# character -> (frames per sequence, front only)
+CHARACTERS = {
+    "clerk": (10, False),
+    "neeko": (4, True),
+    "monopoly_face": (10, True),
+}
+SCALES = (0.5, 0.7, 1.0)
+
+
+def result(value, unit, **extra):
+    return {"value": round(value, 4), "unit": unit, **extra}
+
+
+def bench_load(repeat):
+    """CharacterAnimation load time per character and scale, from PNGs and from a sprite bundle"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for character, (frames, front_only) in CHARACTERS.items():
+            for scale in SCALES:
+                path = os.path.join(tmp, f"{character}@{scale:g}.bundle")
+                compile_bundle(character, scale, out_path=path)
+                bundle = SpriteBundle(path)
+                for source, source_bundle in (("png", None), ("bundle", bundle)):
+                    seconds = best_of(lambda: CharacterAnimation(
+                        "idle", 100, frames, scale, character, front_only,
+                        bundle=source_bundle, frame_store=FrameStore()), repeat)
+                    results[f"load.{character}.x{scale:g}.{source}"] = result(seconds * 1000, "ms")
+                bundle.close()
+    return results
+
+
+def bench_draw(frames):
+    """AvatarManager.draw per frame, full redraw and dirty-rect redraw of a changed frame"""
+    results = {}
+    screen = pygame.display.get_surface()
+    for character, (count, front_only) in CHARACTERS.items():
+        avatar = AvatarManager(character_name=character, frames_count=count, scale=0.7,
+                               is_front_only=front_only)
+
+        def full():
+            for i in range(frames):
+                for animation in avatar.states.values():
+                    animation.current_frame = i % count
+                screen.fill((0, 0, 0))
+                avatar.draw(screen, i % 2 == 0)
+
+        def dirty():
+            for i in range(frames):
+                for animation in avatar.states.values():
+                    animation.current_frame = i % count
+                avatar.invalidate()
+                avatar.draw_dirty(screen, i % 2 == 0)
+
+        results[f"draw.{character}.full"] = result(best_of(full, 3) / frames * 1000, "ms/frame")
+        results[f"draw.{character}.dirty"] = result(best_of(dirty, 3) / frames * 1000, "ms/frame")
+        avatar.bundle and avatar.bundle.close()
+    return results
+
+
+def bench_chunking(speech_manager, repeat):
+    """Text → chunks as done by speak(), on texts not seen before (bypasses the chunk-plan memo)"""
+    results = {}
+    for words in (50, 500, 5000):
+        text = " ".join((TEXT * (words // 20 + 1)).split()[:words])
+        runs = iter(range(10 ** 9))
+        seconds = best_of(lambda: speech_manager._prepare(f"{next(runs)} {text}"), repeat)
+        results[f"chunking.{words}_words"] = result(seconds / words * 1e6, "us/word")
+    return results
+
+
+def bench_postprocess(repeat):
+    """Decode, time-stretch and mixer conversion per second of synthesized audio"""
+    backend = ToneBackend()
+    fmt = audio_utils.mixer_format()
+    data = backend.synthesize(TEXT * 4, "en", "us")
+    segment = audio_utils.decode(data.data, data.format)
+    audio_seconds = len(segment) / 1000
+    stretched = time_stretch.speedup(segment, PLAYBACK_SPEED)
+    stages = {
+        "decode": lambda: audio_utils.decode(data.data, data.format),
+        "time_stretch": lambda: time_stretch.speedup(segment, PLAYBACK_SPEED),
+        "to_mixer_pcm": lambda: audio_utils.to_mixer_pcm(stretched, fmt),
+    }
+    results = {f"audio.{name}": result(best_of(fn, repeat) / audio_seconds * 1000, "ms/audio_s")
+               for name, fn in stages.items()}
+    results["audio.total"] = result(sum(r["value"] for r in results.values()), "ms/audio_s")
+    return results
+
+
+class ReplayBackend(TTSBackend):
+    """Returns the same recorded audio after a delay, like a network TTS that costs no local CPU"""
+    name = "replay"
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.audio = ToneBackend().synthesize(TEXT, "en", "us")
+
+    def synthesize(self, text, lang, tld):
+        time.sleep(self.latency)
+        return self.audio
+
+
+def bench_frames_during_synthesis(seconds):
+    """Frame latency (due → drawn) of a render loop at FPS while long messages are synthesized"""
+    screen = pygame.display.get_surface()
+    avatar = AvatarManager(character_name="clerk", frames_count=10, scale=0.7, is_front_only=False)
+    results = {}
+    modes = {"idle": 0, "inline": 0, "processes": AUDIO_PROCESS_WORKERS or 2}
+    for mode, workers in modes.items():
+        speech_manager = SpeechManager(tts_cache=TTSCache(disk_dir=None), backend=ReplayBackend(),
+                                       audio_workers=workers)
+        busy = threading.Event()
+        if mode != "idle":
+            def synthesize():
+                while busy.is_set():
+                    speech_manager.synthesize_chunks(f"{time.perf_counter()} {TEXT * 10}")
+            busy.set()
+            threading.Thread(target=synthesize, daemon=True).start()
+        # Measured from when each frame was due, so waiting for the GIL after the sleep counts
+        timings = []
+        due = time.perf_counter()
+        end = due + seconds
+        i = 0
+        while due < end:
+            time.sleep(max(due - time.perf_counter(), 0))
+            avatar.states["talking"].current_frame = i % 10
+            i += 1
+            dirty = avatar.draw_dirty(screen, True)
+            pygame.display.update(dirty)
+            timings.append(time.perf_counter() - due)
+            due = max(due + 1 / FPS, time.perf_counter())
+        busy.clear()
+        speech_manager.scheduler.shutdown()
+        speech_manager.audio_processes and speech_manager.audio_processes.shutdown()
+        timings.sort()
+        for pct in (50, 99):
+            value = timings[min(len(timings) * pct // 100, len(timings) - 1)]
+            results[f"frames_during_synthesis.{mode}.p{pct}"] = result(value * 1000, "ms/frame")
+        results[f"frames_during_synthesis.{mode}.max"] = result(timings[-1] * 1000, "ms/frame")
+    avatar.bundle and avatar.bundle.close()
+    return results
+
+
+def bench_first_audio(messages, latency):
+    """Message queued → first chunk playing, with a synthesis latency of `latency` seconds"""
+    speech_manager = SpeechManager(tts_cache=TTSCache(disk_dir=None), backend=ToneBackend(latency=latency))
+    if speech_manager.audio_processes:
+        speech_manager.audio_processes.wait_ready()      # measure messages, not interpreter start-up
+    results = {}
+    for label, unique in (("cold", True), ("cached", False)):
+        timings = time_to_first_audio(speech_manager, [f"Message {n if unique else 0}. {TEXT}"
+                                                       for n in range(messages)])
+        results[f"first_audio.{label}.p50"] = result(statistics.median(timings) * 1000, "ms", latency_s=latency)
+        results[f"first_audio.{label}.max"] = result(timings[-1] * 1000, "ms", latency_s=latency)
+    return results, speech_manager
+
+
+def bench_first_audio_streaming(speech_manager, messages, latency):
+    """
+    Cold first audio for several first-chunk sizes, with the first chunk played
+    whole once synthesized vs streamed from the ring buffer part by part
+    (ToneBackend, like gTTS, requests ~100 characters per part at `latency` each)
+    """
+    controller = speech_manager.chunk_controller
+    first_words, streaming = controller.first_words, speech_manager.stream_first_chunk
+    results = {}
+    try:
+        for words in (6, 24, 40):
+            controller.first_words = words
+            for label, stream in (("whole", False), ("streamed", True)):
+                speech_manager.stream_first_chunk = stream
+                timings = time_to_first_audio(speech_manager, [f"{label} {words} {n}. {TEXT * 3}"
+                                                               for n in range(messages)])
+                results[f"first_audio.{words}w.{label}.p50"] = result(statistics.median(timings) * 1000, "ms",
+                                                                       latency_s=latency)
+    finally:
+        controller.first_words, speech_manager.stream_first_chunk = first_words, streaming
+    return results
+
+
+def time_to_first_audio(speech_manager, texts):
+    """Sorted seconds from enqueue() to the mixer playing, one message at a time from an idle pipeline"""
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        speech_manager.enqueue(text)
+        while not speech_manager.is_speaking:
+            speech_manager.process_queue()
+            time.sleep(0.001)
+        timings.append(time.perf_counter() - start)
+        utterance = speech_manager._current
+        speech_manager.interrupt()
+        # Let the interrupted message's running jobs stop, so they don't slow the next one down
+        futures.wait(utterance.jobs)
+    return sorted(timings)
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Print changes against a previous run; returns the names that regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n{'benchmark':<34} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results.items():
+        old = baseline.get(name)
+        if old is None or not old["value"]:
+            continue
+        change = current["value"] / old["value"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<34} {old['value']:10.3f} {current['value']:10.3f} {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--baseline", help="previous --out file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before flagging (0.15 = 15%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="simulated TTS latency in seconds")
+    parser.add_argument("--synthesis-seconds", type=float, default=5.0,
+                        help="render time per mode in the frames-during-synthesis benchmark")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+
+    results = {}
+    first_audio, speech_manager = bench_first_audio(args.messages, args.tts_latency)
+    results.update(bench_load(args.repeat))
+    results.update(bench_draw(args.frames))
+    results.update(bench_chunking(speech_manager, args.repeat))
+    results.update(bench_postprocess(args.repeat))
+    results.update(bench_frames_during_synthesis(args.synthesis_seconds))
+    results.update(first_audio)
+    results.update(bench_first_audio_streaming(speech_manager, args.messages, args.tts_latency))
+
+    for name, r in results.items():
+        print(f"{name:<34} {r['value']:10.3f} {r['unit']}")
+    with open(args.out, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
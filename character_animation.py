@@ -1,61 +1,98 @@
 import sys
 import pygame
+from frame_store import FrameStore
+
+DIRECTIONS = ("front", "back", "left", "right")
 
 class CharacterAnimation:
-    def __init__(self, asset_name, playback_speed, frame_count=4, scale=1.0, character_name="", is_front_only=True):
+    def __init__(self, asset_name, playback_speed, frame_count=4, scale=1.0, character_name="", is_front_only=True,
+                 bundle=None, frame_store=None, lazy=False):
         """Initialize animation sequences for all directions"""
         self.asset_name = asset_name
+        self.bundle = bundle
         self.playback_speed = playback_speed
         self.frame_count = frame_count
         self.character_name = character_name
         self.scale = scale
+        self.is_front_only = is_front_only
+        self.frame_store = frame_store if frame_store is not None else FrameStore()
+        self.lazy = lazy
         self.current_frame = 0
         self.last_update = 0
-        
-        if is_front_only:
-            self.front = self._load_sequence("front")
-            self.back = self._load_sequence("front")
-            self.left = self._load_sequence("front")
-            self.right = self._load_sequence("front")
-        else:
-            self.front = self._load_sequence("front")
-            self.back = self._load_sequence("back")
-            self.left = self._load_sequence("left")
-            self.right = self._load_sequence("right")
-    
+        self.angles = {}
+
+        if not lazy:
+            for direction in DIRECTIONS:
+                self._load_sequence(direction)
+
+    def _source_direction(self, direction):
+        # Front-only characters reuse the "front" frames, so every direction maps to one key
+        return "front" if self.is_front_only else direction
+
+    def _key(self, direction, i, *extra):
+        return (self.character_name, self.asset_name, self.scale, self._source_direction(direction), i) + extra
+
     def _load_sequence(self, direction):
         """Load and scale animation frames for a direction"""
-        frames = []
-        for i in range(self.frame_count):
-            try:
-                assets_path = f"assets/{self.asset_name}/{direction}/{self.asset_name}{i+1}.png"
-                if self.character_name:
-                    assets_path = f"assets/{self.character_name}/{self.asset_name}/{direction}/{self.asset_name}{i+1}.png"
-                img = pygame.image.load(
-                    assets_path
-                ).convert_alpha()
-                if self.scale != 1.0:
-                    size = (int(img.get_width() * self.scale), 
-                            int(img.get_height() * self.scale))
-                    img = pygame.transform.scale(img, size)
-                frames.append(img)
-            except Exception as e:
-                print(f"Error loading {direction} frame {i}: {e}")
-                sys.exit(1)
-        return frames
-    
-    def update(self):
-        """Update animation frame based on playback speed"""
-        now = pygame.time.get_ticks()
+        return [self.frame(direction, i) for i in range(self.frame_count)]
+
+    def _load_frame(self, direction, i):
+        """Load and scale a single frame from the sprite bundle or PNG"""
+        if self.bundle and self.bundle.has(self.asset_name, direction):
+            return self.bundle.load_frame(self.asset_name, direction, i)
+        try:
+            assets_path = f"assets/{self.asset_name}/{direction}/{self.asset_name}{i+1}.png"
+            if self.character_name:
+                assets_path = f"assets/{self.character_name}/{self.asset_name}/{direction}/{self.asset_name}{i+1}.png"
+            img = pygame.image.load(
+                assets_path
+            ).convert_alpha()
+            if self.scale != 1.0:
+                size = (int(img.get_width() * self.scale),
+                        int(img.get_height() * self.scale))
+                img = pygame.transform.scale(img, size)
+            return img
+        except Exception as e:
+            print(f"Error loading {direction} frame {i}: {e}")
+            sys.exit(1)
+
+    def frame(self, direction, i):
+        """Frame i for a direction, loaded through the frame store"""
+        source = self._source_direction(direction)
+        return self.frame_store.get(self._key(direction, i), lambda: self._load_frame(source, i))
+
+    def rotated_frame(self, direction, i):
+        """Frame i for a direction, rotated by the angle registered in prerotate()"""
+        angle = self.angles[direction]
+        return self.frame_store.get(self._key(direction, i, angle),
+                                    lambda: pygame.transform.rotate(self.frame(direction, i), angle))
+
+    def prerotate(self, angles):
+        """Cache rotated copies of every frame so drawing needs no per-frame transforms"""
+        self.angles = dict(angles)
+        if not self.lazy:
+            for direction in self.angles:
+                for i in range(self.frame_count):
+                    self.rotated_frame(direction, i)
+
+    def update(self, now=None):
+        """Update animation frame based on playback speed; now (ms) defaults to pygame's clock"""
+        if now is None:
+            now = pygame.time.get_ticks()
         if now - self.last_update > self.playback_speed:
             self.current_frame = (self.current_frame + 1) % self.frame_count
             self.last_update = now
-    
+
+    def next_update(self, now=None):
+        """Milliseconds until update() will advance to the next frame"""
+        if now is None:
+            now = pygame.time.get_ticks()
+        return max(self.last_update + self.playback_speed + 1 - now, 0)
+
     def get_frame(self, direction):
         """Get current frame for specified direction"""
-        return {
-            "front": self.front,
-            "back": self.back,
-            "left": self.left,
-            "right": self.right
-        }[direction][self.current_frame]
\ No newline at end of file
+        return self.frame(direction, self.current_frame)
+
+    def get_rotated_frame(self, direction):
+        """Get current pre-rotated frame for specified direction"""
+        return self.rotated_frame(direction, self.current_frame)
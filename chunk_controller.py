@@ -0,0 +1,118 @@
+import threading
+from collections import deque
+
+
+class ChunkSizeController:
+    """
+    Sizes speech chunks from measured synthesis and playback speed.
+
+    Every synthesized chunk reports (words, synthesis seconds, audio seconds).
+    From those the controller fits synthesis time ~ overhead + per_word * words
+    and audio time ~ audio_per_word * words. A ChunkPlan then replays the
+    pipeline for one message: the first chunk is tiny for a fast
+    time-to-first-audio, and each following chunk gets as many words as can
+    be synthesized before the previous one is predicted to finish playing.
+    """
+
+    def __init__(self, workers=4, first_words=6, min_words=4, max_words=40, margin=0.2,
+                 overhead=0.6, per_word=0.02, audio_per_word=0.3, history=50):
+        self.workers = workers
+        self.first_words = first_words
+        self.min_words = min_words
+        self.max_words = max_words
+        self.margin = margin
+        self.overhead = overhead
+        self.per_word = per_word
+        self.audio_per_word = audio_per_word
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.decisions = deque(maxlen=history)
+        self.measured_slack = deque(maxlen=history)
+        self.gaps = 0
+
+    def record(self, words, synth_seconds, audio_seconds):
+        """Measurement of one synthesized chunk (not a cache hit)"""
+        if words <= 0:
+            return
+        with self._lock:
+            self._samples.append((words, synth_seconds))
+            self.audio_per_word += 0.2 * (audio_seconds / words - self.audio_per_word)
+            self._fit()
+
+    def record_slack(self, slack):
+        """How long a chunk was ready before the previous one ended (negative = audible gap)"""
+        with self._lock:
+            self.measured_slack.append(slack)
+            if slack < 0:
+                self.gaps += 1
+
+    def plan(self):
+        return ChunkPlan(self)
+
+    def _fit(self):
+        """Least-squares line through (words, synthesis seconds)"""
+        n = len(self._samples)
+        mean_w = sum(w for w, _ in self._samples) / n
+        mean_t = sum(t for _, t in self._samples) / n
+        var_w = sum((w - mean_w) ** 2 for w, _ in self._samples)
+        if n >= 3 and var_w > 0:
+            slope = sum((w - mean_w) * (t - mean_t) for w, t in self._samples) / var_w
+            self.per_word = max(slope, 1e-3)
+            self.overhead = max(mean_t - self.per_word * mean_w, 0.0)
+        else:
+            self.overhead = max(mean_t - self.per_word * mean_w, 0.0)
+
+    @property
+    def stats(self):
+        with self._lock:
+            slack = list(self.measured_slack)
+            return {
+                "model": {
+                    "overhead_s": round(self.overhead, 4),
+                    "per_word_s": round(self.per_word, 4),
+                    "audio_per_word_s": round(self.audio_per_word, 4),
+                    "samples": len(self._samples),
+                },
+                "decisions": list(self.decisions),
+                "slack": {
+                    "last_s": round(slack[-1], 4) if slack else None,
+                    "mean_s": round(sum(slack) / len(slack), 4) if slack else None,
+                    "min_s": round(min(slack), 4) if slack else None,
+                    "gaps": self.gaps,
+                },
+            }
+
+
+class ChunkPlan:
+    """Per-message simulation of the synthesis pool and playback, used as a segmenter target"""
+
+    def __init__(self, controller: ChunkSizeController):
+        self.controller = controller
+        self._worker_free = [0.0] * max(controller.workers, 1)
+        self._play_end = 0.0
+        self._start = 0.0
+
+    def target_words(self, idx):
+        c = self.controller
+        self._start = min(self._worker_free)
+        if idx == 0:
+            return c.first_words
+        # Finish synthesizing `margin` seconds before the previous chunk stops playing
+        budget = self._play_end - c.margin - self._start - c.overhead
+        words = int(budget / c.per_word)
+        return min(max(words, c.min_words), c.max_words)
+
+    def emitted(self, idx, words):
+        """The segmenter produced chunk idx with this many words; advance the simulation"""
+        c = self.controller
+        ready = self._start + c.overhead + c.per_word * words
+        slot = self._worker_free.index(min(self._worker_free))
+        self._worker_free[slot] = ready
+        slack = self._play_end - ready if idx > 0 else None
+        self._play_end = max(self._play_end, ready) + c.audio_per_word * words
+        c.decisions.append({
+            "idx": idx,
+            "words": words,
+            "predicted_ready_s": round(ready, 3),
+            "predicted_slack_s": None if slack is None else round(slack, 3),
+        })
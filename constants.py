@@ -1,2 +1,90 @@
 WIDTH, HEIGHT = 1800, 1000
-FROM_CENTER = 300
\ No newline at end of file
+FROM_CENTER = 300
+FPS = 60
+
+# Avatars run by main.py in one process (see avatar_host.py). Each is drawn in its
+# viewport (x, y, width, height) of the window and served under /<name>/...; the
+# first one also answers the unprefixed routes. Other keys go to AvatarManager.
+AVATARS = [
+    {"name": "clerk", "character_name": "clerk", "frames_count": 10, "scale": 0.7, "is_front_only": False,
+     "speed_talking": 70, "speed_idle": 100, "viewport": (0, 0, WIDTH, HEIGHT)},
+    # {"name": "monopoly", "character_name": "monopoly_face", "frames_count": 10, "scale": 0.3,
+    #  "is_front_only": True, "speed_talking": 70, "speed_idle": 100,
+    #  "viewport": (WIDTH // 2, 0, WIDTH // 2, HEIGHT), "distance_from_center": 200},
+]
+
+# The main loop sleeps until the next animation frame, the end of the chunk being
+# played or a wake-up from the speech manager (new message, finished synthesis).
+# After IDLE_ANIMATION_SECONDS without speech the idle animation pauses (None keeps
+# it running); window events are picked up at least every EVENT_POLL_SECONDS.
+IDLE_ANIMATION_SECONDS = 60
+EVENT_POLL_SECONDS = 0.25
+
+# Only redraw and present the face rects when an animation frame changes
+DIRTY_RECT_RENDERING = True
+
+# Cap on decoded/rotated frame memory (None = unlimited), shared by all avatars in a
+# process; LRU frames are reloaded on demand
+FRAME_MEMORY_BUDGET_MB = None
+
+# Phrases synthesized into the TTS cache in the background at startup
+PREWARM_PHRASES = [
+    "Hello! How can I help you today?",
+    "Thank you, have a nice day!",
+]
+
+# Fixed number of TTS synthesis worker threads
+SYNTHESIS_WORKERS = 4
+
+# Worker processes for decode/time-stretch/resample (see audio_pool.py), so
+# synthesis doesn't stall the render loop on the GIL; 0 runs it in the threads above
+AUDIO_PROCESS_WORKERS = 2
+
+# While a message plays, pre-synthesize the first chunks of the next queued messages
+LOOKAHEAD_MESSAGES = 2
+LOOKAHEAD_CHUNKS = 2
+LOOKAHEAD_MAX_INFLIGHT_CHUNKS = 4
+
+# TTS backend ("gtts" or the offline "tone"), with per-request timeout, retries and
+# hedging: a second request (on the alternate backend, if set) fires once the first
+# is slower than this percentile of recent latencies
+TTS_BACKEND = "gtts"
+TTS_ALTERNATE_BACKEND = None
+TTS_TIMEOUT = 10.0
+TTS_RETRIES = 1
+TTS_HEDGE_PERCENTILE = 0.95
+
+# Tempo applied to every synthesized chunk (pitch-preserving, see time_stretch.py)
+PLAYBACK_SPEED = 1.3
+
+# Lip sync: the talking frame follows the audio envelope, one mouth level per step
+# (from a timeline computed once per synthesized chunk); False cycles frames on a timer
+LIP_SYNC = True
+LIP_SYNC_STEP_SECONDS = 0.04
+
+# Adaptive chunk sizing: a tiny first chunk, then chunks sized from measured
+# synthesis/playback speed to be ready CHUNK_SLACK_MARGIN seconds before needed
+FIRST_CHUNK_WORDS = 6
+MIN_CHUNK_WORDS = 4
+MAX_CHUNK_WORDS = 40
+CHUNK_SLACK_MARGIN = 0.2
+
+# Streaming playback: the first chunk of the message being spoken is decoded part by
+# part into a PCM ring buffer and starts playing once STREAM_START_SECONDS of audio
+# are buffered, instead of after the whole chunk has been synthesized
+STREAM_FIRST_CHUNK = True
+STREAM_START_SECONDS = 0.3
+STREAM_BUFFER_SECONDS = 30     # ring capacity; the synthesis worker waits when it is full
+
+# Bounded message queue: when full, "reject" (HTTP 429), "drop_oldest" (same or
+# lower priority) or "coalesce" (merge duplicate/superseded messages, else reject)
+MESSAGE_QUEUE_SIZE = 32
+MESSAGE_QUEUE_POLICY = "coalesce"
+
+# Ingestion server: "asyncio" (HTTP + WebSocket on its own event loop) or the Flask dev server
+WEB_SERVER = "asyncio"
+WEB_PORT = 5001
+WS_PORT = 5002
+# A streamed message (/stream-message body or WebSocket "stream" frames) that gets no
+# new data for this long is ended, so a stalled producer can't hold up the avatar's queue
+MESSAGE_STREAM_IDLE_SECONDS = 30
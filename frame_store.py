@@ -0,0 +1,87 @@
+import hashlib
+from collections import OrderedDict
+
+
+class FrameStore:
+    """
+    Shared cache of animation surfaces.
+
+    Frames are requested by key together with a loader; identical pixel data
+    (e.g. the same "front" sequence reused for every direction) is stored once.
+    With a memory budget, the least recently used surfaces are evicted and
+    reloaded on demand.
+    """
+
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes
+        self.bytes_used = 0
+        self._keys = {}                  # key -> digest
+        self._surfaces = OrderedDict()   # digest -> surface, in LRU order
+        self._digest_keys = {}           # digest -> keys sharing it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """Return the surface for key, calling loader() on a miss"""
+        digest = self._keys.get(key)
+        if digest is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(digest)
+            return self._surfaces[digest]
+
+        self.misses += 1
+        surface = loader()
+        digest = self._digest(surface)
+        if digest in self._surfaces:
+            # Same pixels already stored under another key
+            surface = self._surfaces[digest]
+            self._surfaces.move_to_end(digest)
+        else:
+            self._surfaces[digest] = surface
+            self._digest_keys[digest] = set()
+            self.bytes_used += self._size(surface)
+        self._keys[key] = digest
+        self._digest_keys[digest].add(key)
+        self._evict()
+        return surface
+
+    def clear(self):
+        self._keys.clear()
+        self._surfaces.clear()
+        self._digest_keys.clear()
+        self.bytes_used = 0
+
+    @property
+    def stats(self):
+        return {
+            "surfaces": len(self._surfaces),
+            "keys": len(self._keys),
+            "bytes_used": self.bytes_used,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        if self.budget_bytes is None:
+            return
+        # Never evict the most recent surface, it is about to be drawn
+        while self.bytes_used > self.budget_bytes and len(self._surfaces) > 1:
+            digest, surface = self._surfaces.popitem(last=False)
+            for key in self._digest_keys.pop(digest):
+                del self._keys[key]
+            self.bytes_used -= self._size(surface)
+            self.evictions += 1
+
+    @staticmethod
+    def _digest(surface):
+        view = surface.get_view("1")
+        digest = hashlib.blake2b(view, digest_size=16).digest()
+        del view
+        return digest, surface.get_size()
+
+    @staticmethod
+    def _size(surface):
+        return surface.get_pitch() * surface.get_height()
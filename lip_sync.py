@@ -0,0 +1,64 @@
+"""
+Lip sync from the audio envelope.
+
+timeline() turns a chunk's PCM into one loudness level per step (a bytes
+object, 0 = silence), vectorized over the whole chunk once when it is
+synthesized. During playback the level is a single index at the playback
+position (level_at), and mouth_frames() maps levels to the talking frames
+ordered from most closed to most open.
+"""
+import numpy as np
+import pygame
+
+LEVELS = 6
+# RMS below this fraction of full scale counts as silence (mouth closed)
+SILENCE_RMS = 0.01
+# Frames are compared at this size when ranking mouth openness
+THUMBNAIL = (64, 64)
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def timeline(pcm: bytes, fmt, step: float, levels: int = LEVELS) -> bytes:
+    """One level (0..levels-1) per `step` seconds of mixer-format PCM"""
+    frame_rate, sample_width, channels = fmt
+    full_scale = float(2 ** (8 * sample_width - 1))
+    samples = np.frombuffer(pcm, dtype=_DTYPES[sample_width]).astype(np.float32)
+    if sample_width == 1:
+        samples -= 128.0                # 8-bit PCM is unsigned
+    samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+
+    window = max(int(frame_rate * step), 1)
+    count = -(-len(samples) // window)
+    padded = np.zeros(count * window, dtype=np.float32)
+    padded[:len(samples)] = samples
+    rms = np.sqrt(np.mean(padded.reshape(count, window) ** 2, axis=1)) / full_scale
+
+    voiced = rms >= SILENCE_RMS
+    if not voiced.any():
+        return bytes(count)
+    # Relative to this chunk's loud parts, so quiet and loud voices both use the full range
+    loud = np.percentile(rms[voiced], 95)
+    level = np.ceil(np.clip(rms / loud, 0.0, 1.0) * (levels - 1))
+    level[~voiced] = 0
+    return level.astype(np.uint8).tobytes()
+
+
+def level_at(levels: bytes, step: float, position: float) -> int:
+    """Level at `position` seconds into the chunk; 0 outside it"""
+    i = int(position / step)
+    return levels[i] if 0 <= i < len(levels) else 0
+
+
+def mouth_frames(talking, idle, levels: int = LEVELS):
+    """
+    Talking frame for each level, from the frames that differ least from the
+    idle pose (mouth closed) to those that differ most (mouth open).
+    """
+    def thumbnail(surface):
+        return pygame.surfarray.array3d(pygame.transform.smoothscale(surface, THUMBNAIL)).astype(np.int16)
+
+    rest = thumbnail(idle.frame("front", 0))
+    openness = [np.abs(thumbnail(talking.frame("front", i)) - rest).mean() for i in range(talking.frame_count)]
+    ranked = sorted(range(talking.frame_count), key=lambda i: openness[i])
+    return [ranked[round(level * (len(ranked) - 1) / (levels - 1))] for level in range(levels)]
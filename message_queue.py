@@ -0,0 +1,167 @@
+import queue
+import threading
+from collections import deque, namedtuple
+
+URGENT, NORMAL, AMBIENT = 0, 1, 2
+PRIORITIES = {"urgent": URGENT, "normal": NORMAL, "ambient": AMBIENT}
+
+# What to do with a message that arrives when the queue is full
+REJECT = "reject"              # refuse it (HTTP 429)
+DROP_OLDEST = "drop_oldest"    # evict the oldest message of the same or lower priority
+COALESCE = "coalesce"          # merge duplicates / superseded messages, then refuse if still full
+POLICIES = (REJECT, DROP_OLDEST, COALESCE)
+
+# status: "queued" or "coalesced"; ahead: items that will be spoken before this one
+Admission = namedtuple("Admission", "status depth position ahead dropped")
+
+
+class QueueFull(Exception):
+    def __init__(self, depth, retry_after=None):
+        super().__init__(f"Message queue full ({depth} queued)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class _Entry:
+    __slots__ = ("item", "key", "priority", "evictable")
+
+    def __init__(self, item, key, priority, evictable):
+        self.item = item
+        self.key = key
+        self.priority = priority
+        self.evictable = evictable
+
+
+class MessageQueue:
+    """
+    Bounded message queue with priorities, drained urgent → normal → ambient
+    and first-in first-out within a priority.
+
+    Under the coalesce policy a message that arrives while the queue is full
+    replaces a queued one with the same key (a producer-chosen id such as
+    "weather", or the text itself), so under load repeated or superseded
+    updates are spoken once, in the latest version.
+    Only string messages are dropped or coalesced; streams already being fed
+    (non-str items) just count against the capacity.
+    """
+
+    def __init__(self, maxsize: int = 32, policy: str = COALESCE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._levels = {priority: deque() for priority in sorted(PRIORITIES.values())}
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, item, priority: int = NORMAL, key=None) -> Admission:
+        """Queue item or raise QueueFull; never blocks"""
+        if priority not in self._levels:
+            raise ValueError(f"Unknown priority {priority!r}")
+        evictable = isinstance(item, str)
+        if key is None and evictable:
+            key = item
+        with self._lock:
+            if self.policy == COALESCE and evictable and self._depth() >= self.maxsize:
+                old = self._find(key)
+                if old is not None:
+                    return self._coalesce(old, item, priority)
+
+            dropped = []
+            if self._depth() >= self.maxsize:
+                victim = self._victim(priority) if self.policy == DROP_OLDEST else None
+                if victim is None:
+                    self.rejected += 1
+                    raise QueueFull(self._depth())
+                self._levels[victim.priority].remove(victim)
+                dropped.append(victim.item)
+                self.dropped += 1
+
+            self._levels[priority].append(_Entry(item, key, priority, evictable))
+            self.accepted += 1
+            return self._admission("queued", self._levels[priority][-1], dropped)
+
+    def get_nowait(self, with_priority: bool = False):
+        """Next item to speak; with_priority returns (item, priority)"""
+        with self._lock:
+            for level in self._levels.values():
+                if level:
+                    entry = level.popleft()
+                    return (entry.item, entry.priority) if with_priority else entry.item
+        raise queue.Empty
+
+    def head_priority(self):
+        """Priority of the item get_nowait() would return, None when empty"""
+        with self._lock:
+            for priority, level in self._levels.items():
+                if level:
+                    return priority
+        return None
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def qsize(self) -> int:
+        with self._lock:
+            return self._depth()
+
+    def items(self):
+        """Snapshot of queued items in the order they will be spoken"""
+        with self._lock:
+            return [entry.item for level in self._levels.values() for entry in level]
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self._depth(),
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "by_priority": {name: len(self._levels[p]) for name, p in PRIORITIES.items()},
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+    def _depth(self):
+        return sum(len(level) for level in self._levels.values())
+
+    def _find(self, key):
+        for level in self._levels.values():
+            for entry in level:
+                if entry.evictable and entry.key == key:
+                    return entry
+        return None
+
+    def _coalesce(self, entry, item, priority):
+        # Keep the queued slot so an update isn't pushed to the back; move it up if more urgent
+        entry.item = item
+        if priority < entry.priority:
+            self._levels[entry.priority].remove(entry)
+            entry.priority = priority
+            self._levels[priority].append(entry)
+        self.coalesced += 1
+        return self._admission("coalesced", entry, [])
+
+    def _victim(self, priority):
+        """Oldest droppable message, from the least urgent level no more urgent than priority"""
+        for level_priority in sorted(self._levels, reverse=True):
+            if level_priority < priority:
+                break
+            for entry in self._levels[level_priority]:
+                if entry.evictable:
+                    return entry
+        return None
+
+    def _admission(self, status, entry, dropped):
+        ahead = []
+        for level in self._levels.values():
+            for queued in level:
+                if queued is entry:
+                    return Admission(status, self._depth(), len(ahead), ahead, dropped)
+                ahead.append(queued.item)
+        raise AssertionError("entry not queued")
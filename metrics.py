@@ -0,0 +1,234 @@
+"""
+Prometheus-style metrics without extra dependencies.
+
+Counters, gauges and fixed-bucket histograms are updated in place on the hot
+paths (one perf_counter pair and an uncontended lock per observation) and only
+formatted when /metrics is scraped, in the text exposition format 0.0.4.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FRAME_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.0167, 0.033, 0.05, 0.1, 0.25)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+        if not self.labelnames:
+            # Unlabelled metrics expose their single child's methods directly
+            child = self.labels()
+            for method in ("inc", "dec", "set", "set_function", "observe"):
+                if hasattr(child, method):
+                    setattr(self, method, getattr(child, method))
+
+    def labels(self, *values):
+        """Child for one label combination; keep a reference to it on hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            labels = dict(zip(self.labelnames, values))
+            for suffix, extra, value in child.samples():
+                yield suffix, {**labels, **extra}, value
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield "_total", {}, self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _child = _CounterChild
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead"""
+        self._function = function
+
+    def samples(self):
+        yield "", {}, self._function() if self._function else self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _child = _GaugeChild
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield "_bucket", {"le": bound}, cumulative
+        yield "_sum", {}, total
+        yield "_count", {}, cumulative
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=SECONDS_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_format_value(v) if isinstance(v, float) else v}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---- speech ----
+
+TTS_SYNTHESIS_SECONDS = Histogram(
+    "avatar_tts_synthesis_seconds", "TTS backend latency per chunk", ["backend"])
+TIME_STRETCH_SECONDS = Histogram(
+    "avatar_time_stretch_seconds", "Decode + time-stretch + PCM conversion per chunk")
+TTS_CACHE_REQUESTS = Counter(
+    "avatar_tts_cache_requests", "Chunk audio lookups in the TTS cache", ["result"])
+TTS_ERRORS = Counter("avatar_tts_errors", "Chunks whose synthesis failed")
+TTS_CANCELLED = Counter("avatar_tts_cancelled", "Running synthesis jobs abandoned after an interrupt")
+TIME_TO_FIRST_AUDIO_SECONDS = Histogram(
+    "avatar_time_to_first_audio_seconds", "From a message's turn to speak until its first chunk plays")
+INTER_CHUNK_GAP_SECONDS = Histogram(
+    "avatar_inter_chunk_gap_seconds", "Silence between consecutive chunks of a message (0 when queued in time)",
+    buckets=FRAME_BUCKETS)
+CHUNKS_PLAYED = Counter("avatar_chunks_played", "Chunks handed to the mixer")
+MESSAGES = Counter("avatar_messages", "Messages offered to the queue by outcome", ["status"])
+MESSAGE_QUEUE_DEPTH = Gauge("avatar_message_queue_depth", "Messages waiting in each avatar's queue", ["avatar"])
+INTERRUPTS = Counter("avatar_interrupts", "Barge-in interrupts")
+
+# ---- render ----
+
+FRAME_PHASE_SECONDS = Histogram(
+    "avatar_frame_phase_seconds", "Main loop time per frame phase", ["phase"], buckets=FRAME_BUCKETS)
+FRAME_SECONDS = Histogram(
+    "avatar_frame_seconds", "Main loop work per frame, excluding the frame-rate sleep", buckets=FRAME_BUCKETS)
+MISSED_FRAME_DEADLINES = Counter(
+    "avatar_missed_frame_deadlines", "Frames whose work took longer than the frame budget")
+FRAMES = Counter("avatar_frames", "Dirty-rect frames by outcome", ["result"])
+
+
+class FrameTimer:
+    """Splits one main-loop iteration into phases: start(), mark(phase) after each, finish()"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self._phases = {}
+        self._start = self._last = 0.0
+
+    def start(self):
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        child = self._phases.get(phase)
+        if child is None:
+            child = self._phases[phase] = FRAME_PHASE_SECONDS.labels(phase)
+        child.observe(now - self._last)
+        self._last = now
+
+    def finish(self):
+        elapsed = self._last - self._start
+        FRAME_SECONDS.observe(elapsed)
+        if elapsed > self.budget:
+            MISSED_FRAME_DEADLINES.inc()
+
+
+def render() -> str:
+    return REGISTRY.render()
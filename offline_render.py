@@ -0,0 +1,224 @@
+"""
+Offline export: render a message to video frames plus a synchronized audio
+track, as fast as the CPU allows.
+
+The avatar is driven by a virtual clock (frame i is at i / fps seconds)
+instead of pygame.time.get_ticks() and clock.tick(), and talks exactly while
+the synthesized audio plays. Frames go out as a PNG sequence (encoded in a
+thread pool; zlib releases the GIL), one raw RGB24 file, or raw RGB24 piped to
+an encoder command.
+
+    python offline_render.py "Hello! How can I help you today?" --format png --out export
+    python offline_render.py "Hello!" --format pipe --out export \\
+        --encoder "ffmpeg -y -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {fps} -i - -i {audio} -shortest export/out.mp4"
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import math
+import shlex
+import struct
+import subprocess
+import sys
+import time
+import wave
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+import audio_utils
+import lip_sync
+from avatar_manager import AvatarManager
+from constants import WIDTH, HEIGHT, LIP_SYNC, LIP_SYNC_STEP_SECONDS, TTS_BACKEND, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES, TTS_HEDGE_PERCENTILE
+from speech_manager import SpeechManager
+from tts_backends import BACKENDS, create_backend
+
+FORMATS = ("png", "raw", "pipe")
+
+
+class VirtualClock:
+    """Frame-locked time in milliseconds, in place of pygame.time.get_ticks()"""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.frame = 0
+
+    @property
+    def seconds(self):
+        return self.frame / self.fps
+
+    @property
+    def ms(self):
+        return self.frame * 1000 / self.fps
+
+    def tick(self):
+        self.frame += 1
+
+
+def encode_png(rgb: bytes, width: int, height: int, level: int = 1) -> bytes:
+    """RGB24 → PNG (no filtering, so the cost is almost all zlib)"""
+    stride = width * 3
+    scanlines = b"".join(b"\x00" + rgb[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(scanlines, level))
+            + chunk(b"IEND", b""))
+
+
+class PNGSequenceWriter:
+    """frame_000000.png, ... encoded and written by a pool of workers"""
+
+    def __init__(self, out_dir, width, height, workers=None, level=1):
+        self.out_dir = out_dir
+        self.width = width
+        self.height = height
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="png-encoder")
+        self._pending = deque()
+
+    def write(self, index, rgb):
+        self._pending.append(self._pool.submit(self._encode, index, rgb))
+        # Bound the frames held in memory; also surfaces encoder errors early
+        while len(self._pending) > 2 * self.workers:
+            self._pending.popleft().result()
+
+    def _encode(self, index, rgb):
+        with open(os.path.join(self.out_dir, f"frame_{index:06d}.png"), "wb") as f:
+            f.write(encode_png(rgb, self.width, self.height, self.level))
+
+    def close(self):
+        while self._pending:
+            self._pending.popleft().result()
+        self._pool.shutdown()
+
+
+class StreamWriter:
+    """Raw RGB24 frames, in order, to a file or an encoder's stdin"""
+
+    def __init__(self, path=None, command=None):
+        self._process = None
+        if command:
+            self._process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE)
+            self._stream = self._process.stdin
+        else:
+            self._stream = open(path, "wb")
+
+    def write(self, index, rgb):
+        self._stream.write(rgb)
+
+    def close(self):
+        self._stream.close()
+        if self._process and self._process.wait() != 0:
+            raise RuntimeError(f"Encoder exited with status {self._process.returncode}")
+
+
+def write_wav(path, pcm, fmt):
+    frame_rate, sample_width, channels = fmt
+    with wave.open(path, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(sample_width)
+        f.setframerate(frame_rate)
+        f.writeframes(pcm)
+
+
+def synthesize_track(speech_manager: SpeechManager, text, lead_in, tail):
+    """Gapless audio for the whole message with silence around it; returns (pcm, fmt, speech start, end)"""
+    fmt = audio_utils.mixer_format()
+    frame_rate, sample_width, channels = fmt
+    bytes_per_second = frame_rate * sample_width * channels
+    speech = b"".join(speech_manager.synthesize_chunks(text))
+
+    def silence(seconds):
+        return b"\x00" * (int(seconds * frame_rate) * sample_width * channels)
+
+    start = lead_in
+    end = start + len(speech) / bytes_per_second
+    return silence(lead_in) + speech + silence(tail), fmt, start, end
+
+
+def render(avatar: AvatarManager, writer, fps, duration, talking, mouth=lambda t: None):
+    """Render duration seconds of frames; talking(t) decides the avatar state at t, mouth(t) the lip-sync level"""
+    screen = pygame.display.get_surface()
+    clock = VirtualClock(fps)
+    frames = math.ceil(duration * fps)
+    while clock.frame < frames:
+        is_talking = talking(clock.seconds)
+        avatar.update(is_talking, clock.ms, mouth(clock.seconds))
+        screen.fill((0, 0, 0))
+        avatar.draw(screen, is_talking)
+        writer.write(clock.frame, pygame.image.tobytes(screen, "RGB"))
+        clock.tick()
+    writer.close()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("text", help="message to speak ('-' reads stdin)")
+    parser.add_argument("--out", default="export", help="directory for frames and audio.wav")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--encoder", help="pipe command; {width} {height} {fps} {audio} are filled in")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--workers", type=int, help="PNG encoder threads (default: CPU count)")
+    parser.add_argument("--png-level", type=int, default=1, help="zlib level, 0-9")
+    parser.add_argument("--lead-in", type=float, default=0.5, help="idle seconds before speaking")
+    parser.add_argument("--tail", type=float, default=0.5, help="idle seconds after speaking")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=TTS_BACKEND)
+    parser.add_argument("--character", default="clerk")
+    parser.add_argument("--frames-count", type=int, default=10)
+    parser.add_argument("--scale", type=float, default=0.7)
+    parser.add_argument("--front-only", action="store_true")
+    args = parser.parse_args()
+    if args.format == "pipe" and not args.encoder:
+        parser.error("--format pipe needs --encoder")
+    text = sys.stdin.read() if args.text == "-" else args.text
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+
+    speech_manager = SpeechManager(backend=create_backend(
+        args.backend, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES, TTS_HEDGE_PERCENTILE))
+    pcm, fmt, speech_start, speech_end = synthesize_track(speech_manager, text, args.lead_in, args.tail)
+    audio_path = os.path.join(args.out, "audio.wav")
+    write_wav(audio_path, pcm, fmt)
+    synthesized = time.perf_counter()
+
+    avatar = AvatarManager(character_name=args.character, frames_count=args.frames_count, scale=args.scale,
+                           is_front_only=args.front_only, speed_talking=70, speed_idle=100)
+    if args.format == "png":
+        writer = PNGSequenceWriter(args.out, WIDTH, HEIGHT, args.workers, args.png_level)
+    elif args.format == "raw":
+        writer = StreamWriter(path=os.path.join(args.out, "frames.rgb"))
+    else:
+        writer = StreamWriter(command=args.encoder.format(width=WIDTH, height=HEIGHT, fps=args.fps,
+                                                          audio=audio_path))
+    duration = speech_end + args.tail
+    mouth = lambda t: None
+    if LIP_SYNC:
+        timeline = lip_sync.timeline(pcm, fmt, LIP_SYNC_STEP_SECONDS)
+        mouth = lambda t: lip_sync.level_at(timeline, LIP_SYNC_STEP_SECONDS, t)
+    frames = render(avatar, writer, args.fps, duration, lambda t: speech_start <= t < speech_end, mouth)
+    finished = time.perf_counter()
+
+    render_seconds = finished - synthesized
+    print(f"Audio: {audio_path} ({duration:.2f} s, synthesized in {synthesized - started:.2f} s)")
+    print(f"Video: {frames} frames at {args.fps} fps in {render_seconds:.2f} s "
+          f"({frames / render_seconds:.1f} frames/s, {duration / render_seconds:.2f}x real time)")
+    if args.format == "raw":
+        print(f"Mux with: ffmpeg -f rawvideo -pix_fmt rgb24 -s {WIDTH}x{HEIGHT} -r {args.fps} "
+              f"-i {os.path.join(args.out, 'frames.rgb')} -i {audio_path} -shortest out.mp4")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
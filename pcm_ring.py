@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+
+
+class PCMRingBuffer:
+    """
+    Bounded FIFO of decoded audio from one producer thread to one consumer.
+
+    The producer writes each piece as a ready-to-play block (e.g. a Sound and
+    its lip-sync timeline) together with its size in PCM bytes, which is what
+    the capacity counts, so the consumer never touches the samples. write()
+    blocks while the buffer is full, until the consumer catches up or abort()
+    is called; read() never blocks. The producer calls close() after its last
+    write.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._blocks = deque()         # (block, size)
+        self._size = 0
+        self._cond = threading.Condition()
+        self.written = 0
+        self.consumed = 0
+        self.closed = False
+        self.aborted = False
+
+    def write(self, block, size: int):
+        with self._cond:
+            # A block bigger than the whole buffer still goes through once the buffer is empty
+            while self._blocks and self._size + size > self.capacity and not self.aborted:
+                self._cond.wait()
+            if self.aborted:
+                return
+            self._blocks.append((block, size))
+            self._size += size
+            self.written += size
+
+    def read(self):
+        """Oldest block, or None if nothing is buffered"""
+        with self._cond:
+            if not self._blocks:
+                return None
+            block, size = self._blocks.popleft()
+            self._size -= size
+            self.consumed += size
+            self._cond.notify_all()
+            return block
+
+    @property
+    def available(self) -> int:
+        """PCM bytes buffered"""
+        return self._size
+
+    @property
+    def drained(self) -> bool:
+        """Closed and everything written has been read"""
+        return self.closed and not self._blocks
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def abort(self):
+        """Consumer gone: drop what's buffered and let a blocked write() return"""
+        with self._cond:
+            self.aborted = True
+            self.closed = True
+            self._blocks.clear()
+            self._size = 0
+            self._cond.notify_all()
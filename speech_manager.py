@@ -1,141 +1,541 @@
-import threading
+import itertools
 import queue
+import threading
 import time
-import os
-import re
-from gtts import gTTS
-import pygame.mixer
-from pydub import AudioSegment
+from collections import deque, OrderedDict
+from concurrent.futures import CancelledError
+import pygame
+import audio_pool
+import audio_utils
+import lip_sync
+import metrics
+import text_segmenter
+from chunk_controller import ChunkSizeController
+from constants import (SYNTHESIS_WORKERS, AUDIO_PROCESS_WORKERS, LOOKAHEAD_MESSAGES, LOOKAHEAD_CHUNKS, LOOKAHEAD_MAX_INFLIGHT_CHUNKS,
+                       TTS_BACKEND, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES, TTS_HEDGE_PERCENTILE,
+                       PLAYBACK_SPEED, FIRST_CHUNK_WORDS, MIN_CHUNK_WORDS, MAX_CHUNK_WORDS, CHUNK_SLACK_MARGIN,
+                       MESSAGE_QUEUE_SIZE, MESSAGE_QUEUE_POLICY, LIP_SYNC, LIP_SYNC_STEP_SECONDS,
+                       STREAM_FIRST_CHUNK, STREAM_START_SECONDS, STREAM_BUFFER_SECONDS)
+from message_queue import MessageQueue, QueueFull, NORMAL, URGENT
+from pcm_ring import PCMRingBuffer
+from synthesis_scheduler import SynthesisScheduler, BACKGROUND
+from tts_backends import TTSBackend, create_backend
+from tts_cache import TTSCache
+from utterance import Utterance, ReadyChunk
+
+
+# 预热任务排在所有实际消息之后
+PREWARM_PRIORITY = BACKGROUND
+# 记住最近文本的切块方式，重复消息按同样方式切块才能命中 TTS 缓存
+CHUNK_PLAN_CACHE_SIZE = 256
+# 一块音频播完（排队的下一块随即开始）时 mixer 发出的事件，主循环据此调用 process_queue()，不再轮询 get_busy()
+SPEECH_END_EVENT = pygame.event.custom_type()
 
 
 class SpeechManager:
     """
-    message_queue      ← 由外部(Flask)压入整段文本  
-    process_queue()    ← 在 pygame 主循环里持续调用  
-    speak()            ← 内部使用，把文本拆块并并行生成 MP3
+    message_queue      ← 有界优先级队列，由外部(Flask)压入整段文本  
+    enqueue()          ← 入队并返回队列深度与预计开始播放时间，队列满时抛出 QueueFull
+    process_queue()    ← 在 pygame 主循环里持续调用，并提前合成后续消息的前几块
+    open_stream()      ← 流式消息：文本逐段到达，每出现一个句子边界就开始合成
+    interrupt()        ← 打断：立即停止播放，取消当前消息（及排队消息）尚未完成的合成
+    wake()             ← 有新消息或合成完成时唤醒在 wakeup 事件上休眠的主循环
+    mouth_level()      ← 当前播放位置的口型等级（查表，不在每帧分析音频）
+    prewarm()          ← 后台预先合成常用语句，写入 TTS 缓存
     """
 
-    def __init__(self, avatar_manager=None, chunk_size: int = 10):
-        self.message_queue: "queue.Queue[str]" = queue.Queue()
+    _reserved_channels = 0
+
+    def __init__(self, avatar_manager=None, chunk_size: int = FIRST_CHUNK_WORDS, tts_cache: TTSCache = None,
+                 scheduler: SynthesisScheduler = None, backend: TTSBackend = None,
+                 audio_workers: int = AUDIO_PROCESS_WORKERS, audio_processes: audio_pool.AudioProcessPool = None,
+                 name: str = "default", channel: int = 0, wakeup: threading.Event = None):
+        # 多个头像共用一个进程时，合成线程池、音频子进程、TTS 缓存和后端都可以传入共享实例；
+        # 消息队列、声道和播放状态始终是每个 SpeechManager 自己的
+        self.name = name
+        self.message_queue = MessageQueue(MESSAGE_QUEUE_SIZE, MESSAGE_QUEUE_POLICY)
 
         self.avatar_manager = avatar_manager
         self.chunk_size = chunk_size
-        self._ready_mp3 = {}               
-        self._ready_lock = threading.Lock()
-        self._next_play_idx = 0            
-        self._total_chunks = 0             
-        self._generated_cnt = 0            
-        self._generating = False           
+        self.lang = "en"
+        self.tld = "us"
+        self.playback_speed = PLAYBACK_SPEED
+        self.stream_first_chunk = STREAM_FIRST_CHUNK
+        self.tts_cache = tts_cache if tts_cache is not None else TTSCache()
+        self.backend = backend if backend is not None else create_backend(
+            TTS_BACKEND, TTS_ALTERNATE_BACKEND, TTS_TIMEOUT, TTS_RETRIES, TTS_HEDGE_PERCENTILE)
+        # 共享线程池里每个头像是一个分组，轮流占用工作线程，繁忙的头像不会饿死其他头像
+        scheduler = scheduler if scheduler is not None else SynthesisScheduler(SYNTHESIS_WORKERS)
+        self.scheduler = scheduler.group(name)
+        # audio_workers 为 0 时解码和变速仍在合成线程里做
+        if audio_processes is None and audio_workers:
+            audio_processes = audio_pool.AudioProcessPool(audio_workers)
+        self.audio_processes = audio_processes
+        self.chunk_controller = ChunkSizeController(
+            workers=self.scheduler.workers, first_words=chunk_size, min_words=MIN_CHUNK_WORDS,
+            max_words=MAX_CHUNK_WORDS, margin=CHUNK_SLACK_MARGIN)
+        self._chunk_plans = OrderedDict()  # text -> chunks
+        self._current: Utterance = None    # 正在播放的消息
+        self._upcoming = deque()           # 已从队列取出、正在预合成的消息
+        self._order = itertools.count()    # 消息编号，也是该消息所有合成任务的 id
+        self._lock = threading.Lock()      # process_queue() 与其他线程的 interrupt() 互斥
+        self.interrupts = 0
+        self.cancelled_jobs = 0
+        self._wakeup = wakeup or threading.Event()   # 新消息、合成完成、打断时置位，唤醒休眠中的主循环
+        self._playing = ()                 # 声道上正在播和排队的块：(口型时间线, 开始时间, 结束时间)
+        metrics.MESSAGE_QUEUE_DEPTH.labels(name).set_function(lambda: self.message_queue.qsize())
 
         pygame.mixer.init()
+        # 独占一个保留声道：同一进程里的头像互不打断，各自判断是否在说话
+        if pygame.mixer.get_num_channels() <= channel:
+            pygame.mixer.set_num_channels(channel + 1)
+        SpeechManager._reserved_channels = max(SpeechManager._reserved_channels, channel + 1)
+        pygame.mixer.set_reserved(SpeechManager._reserved_channels)
+        self.channel = pygame.mixer.Channel(channel)
+        self.channel.set_endevent(SPEECH_END_EVENT)
 
     @property
     def is_speaking(self) -> bool:
-        return pygame.mixer.get_busy()
+        return self.channel.get_busy()
+
+    @property
+    def stats(self):
+        return {
+            "chunk_controller": self.chunk_controller.stats,
+            "tts_cache": self.tts_cache.stats,
+            "backend": getattr(self.backend, "stats", {}),
+            "message_queue": self.message_queue.stats,
+            "interrupts": self.interrupts,
+            "cancelled_jobs": self.cancelled_jobs,
+        }
 
     def process_queue(self):
-        if self.is_speaking:
+        with self._lock:
+            self._process_queue()
+
+    def _process_queue(self):
+        self._fill_lookahead()
+        # 声道上最多一块在播、一块排队；排队的块开始播放时（SPEECH_END_EVENT）再排下一块
+        if self.channel.get_queue() is not None:
+            return
+        speaking = self.is_speaking
+
+        if self._current is None or self._current.finished:
+            if speaking:
+                return                 # 上一条消息的最后一块还在播，下一条消息等它播完
+            self._current = self._next_utterance()
+        utterance = self._current
+        if utterance is None:
             return
 
-        finished_idx = self._next_play_idx - 1
-        if finished_idx >= 0:
-            old_path = f"tts_{finished_idx}.mp3"
-            temp_old_path = f"temp_tts_{finished_idx}.mp3"
-            if os.path.exists(old_path):
-                os.remove(old_path)
+        idx = utterance.next_play_idx
+        stream = utterance.streams.get(idx)
+        if stream is not None:
+            self._play_stream(utterance, idx, stream, speaking)
+            return
+        job = utterance.next_job()
+        if job is None or not job.done():
+            return
+        utterance.next_play_idx += 1
+        if job.exception() is None:
+            chunk = job.result()
+            # 无缝衔接：排在声道上，上一块最后一个采样之后由 mixer 直接接着播，主线程不参与
+            print(f"{'Queued' if speaking else 'Playing'} audio chunk {idx}")
+            if utterance.play_end is not None:
+                self.chunk_controller.record_slack(utterance.play_end - chunk.ready_at)
+            self._play(utterance, chunk.sound, chunk.lip_sync, speaking, first_audio=idx == 0)
+            metrics.CHUNKS_PLAYED.inc()
+
+    def _play_stream(self, utterance: Utterance, idx: int, stream: PCMRingBuffer, speaking: bool):
+        """Hand the mixer the next block of a chunk that is still being synthesized"""
+        frame_rate, sample_width, channels = audio_utils.mixer_format()
+        first_block = stream.consumed == 0
+        # 先攒够 STREAM_START_SECONDS 再开播；Sound 和口型时间线已由合成线程做好，这里只交给 mixer
+        start_bytes = STREAM_START_SECONDS * frame_rate * sample_width * channels
+        if first_block and stream.available < start_bytes and not stream.closed:
+            return
+        block = stream.read()
+        if block is not None:
+            sound, timeline = block
+            if first_block:
+                print(f"Streaming audio chunk {idx}")
+                metrics.CHUNKS_PLAYED.inc()
+            self._play(utterance, sound, timeline, speaking, first_audio=idx == 0 and first_block)
+        if stream.drained:
+            utterance.next_play_idx += 1
 
-            if os.path.exists(temp_old_path):
-                os.remove(temp_old_path)
+    def _play(self, utterance: Utterance, sound, timeline, speaking: bool, first_audio: bool):
+        """Play sound now, or queue it to start the moment the sound playing ends"""
+        now = time.monotonic()
+        if speaking:
+            self.channel.queue(sound)
+            start = max(utterance.play_end or now, now)
+        else:
+            self.channel.play(sound)
+            start = now
+        end = start + sound.get_length()
+        self._playing = tuple(p for p in self._playing if p[2] > now)[-1:] + ((timeline, start, end),)
+        if first_audio:
+            metrics.TIME_TO_FIRST_AUDIO_SECONDS.observe(start - utterance.started_at)
+        elif utterance.play_end is not None:
+            metrics.INTER_CHUNK_GAP_SECONDS.observe(max(start - utterance.play_end, 0.0))
+        utterance.play_end = end
 
-        with self._ready_lock:
-            path = self._ready_mp3.pop(self._next_play_idx, None)
+    def wake(self, *_):
+        """Wake a main loop sleeping on the wakeup event so it runs process_queue(); safe from any thread"""
+        self._wakeup.set()
 
-        if path:
-            print(f"Playing audio: {path}")
-            pygame.mixer.Sound(path).play()
-            self._next_play_idx += 1
+    def next_deadline(self):
+        """Seconds until the chunk now playing should end (so the next can be queued), None when silent"""
+        playing = self._playing
+        if not playing or not self.is_speaking:
+            return None
+        now = time.monotonic()
+        ends = [end for _, _, end in playing if end > now]
+        # 预计结束时间已过但声卡还在播：稍后再看，不要空转
+        return max(ends[0] - now, 0.005) if ends else 0.005
+
+    def _playing_at(self, now):
+        """(timeline, start, end) of the chunk audible at now, or None"""
+        for segment in self._playing:
+            if now < segment[2]:
+                return segment
+        return None
+
+    def mouth_level(self, now=None):
+        """Lip-sync level (0 = closed) at the current playback position; None when lip sync is off"""
+        if not LIP_SYNC:
+            return None
+        now = time.monotonic() if now is None else now
+        segment = self._playing_at(now)
+        if segment is None:
+            return 0
+        timeline, start, _ = segment
+        return lip_sync.level_at(timeline, LIP_SYNC_STEP_SECONDS, now - start)
+
+    def next_mouth_change(self, now=None):
+        """Seconds until the next lip-sync step while speaking, None otherwise"""
+        if not LIP_SYNC or not self.is_speaking:
+            return None
+        now = time.monotonic() if now is None else now
+        segment = self._playing_at(now)
+        if segment is None:
+            return None
+        return LIP_SYNC_STEP_SECONDS - (now - segment[1]) % LIP_SYNC_STEP_SECONDS
+
+    def _next_utterance(self):
+        """Promote the oldest pre-synthesized message, or take one off the queue if it is more urgent"""
+        while True:
+            head = self.message_queue.head_priority()
+            # 预合成的消息不能排到之后才到的更紧急消息前面；被越过的消息留在 _upcoming，已合成的块不浪费
+            if self._upcoming and (head is None or self._upcoming[0].priority <= head):
+                utterance = self._upcoming.popleft()
+            else:
+                try:
+                    utterance = self._prepare(*self.message_queue.get_nowait(with_priority=True))
+                except queue.Empty:
+                    return None
+            if not utterance.cancelled:
+                utterance.started_at = time.monotonic()
+                utterance.submit(self.scheduler, self._tts_worker)
+                return utterance
+
+    def _fill_lookahead(self):
+        """While a message plays, start synthesizing the first chunks of the next ones"""
+        if self._current is None:
             return
+        inflight = sum(len(utterance.jobs) for utterance in self._upcoming)
+        while (len(self._upcoming) < LOOKAHEAD_MESSAGES
+               and inflight < LOOKAHEAD_MAX_INFLIGHT_CHUNKS
+               and not self.message_queue.empty()):
+            try:
+                utterance = self._prepare(*self.message_queue.get_nowait(with_priority=True))
+            except queue.Empty:
+                return
+            budget = min(LOOKAHEAD_CHUNKS, LOOKAHEAD_MAX_INFLIGHT_CHUNKS - inflight)
+            utterance.submit(self.scheduler, self._tts_worker, stop=budget)
+            inflight += len(utterance.jobs)
+            # 按优先级排在同级消息之后，_upcoming 的顺序就是播放顺序
+            position = next((i for i, queued in enumerate(self._upcoming) if queued.priority > utterance.priority),
+                            len(self._upcoming))
+            self._upcoming.insert(position, utterance)
+
+    def _prepare(self, item, priority: int = NORMAL) -> Utterance:
+        if isinstance(item, Utterance):
+            item.priority = priority
+            return item                # streamed message, already being segmented
+        return Utterance(item, self._split_chunks(item), order=next(self._order), on_done=self.wake,
+                         priority=priority)
+
+    def enqueue(self, text: str, priority: int = NORMAL, key=None):
+        """Queue a message; returns its admission report, raises QueueFull with a retry hint"""
+        try:
+            admission = self.message_queue.put(text, priority, key)
+        except QueueFull as e:
+            metrics.MESSAGES.labels("rejected").inc()
+            raise QueueFull(e.depth, self.estimated_wait(self.message_queue.items(), priority)) from None
+        metrics.MESSAGES.labels(admission.status).inc()
+        if admission.dropped:
+            metrics.MESSAGES.labels("dropped").inc(len(admission.dropped))
+        self.wake()
+        return {
+            "status": admission.status,
+            "depth": admission.depth,
+            "position": admission.position,
+            "dropped": len(admission.dropped),
+            "estimated_start_s": round(self.estimated_wait(admission.ahead, priority), 2),
+        }
+
+    def estimated_wait(self, ahead, priority: int = NORMAL) -> float:
+        """Seconds until a message of this priority queued behind `ahead` would start playing"""
+        # 按模型估算的每词音频时长累加：当前消息剩余部分 + 不比它紧急程度低的预合成消息 + 排在前面的消息
+        audio_per_word = self.chunk_controller.audio_per_word
+        wait = 0.0
+        current = self._current
+        if current is not None and not current.finished:
+            if current.play_end is not None:
+                wait += max(current.play_end - time.monotonic(), 0.0)
+            remaining = current.chunks[current.next_play_idx:]
+            wait += audio_per_word * sum(len(chunk.split()) for chunk in remaining)
+        # 服务器线程调用：在锁内取快照，主线程同时修改 _upcoming 也不会出错
+        with self._lock:
+            upcoming = list(self._upcoming)
+        upcoming = [utterance for utterance in upcoming if utterance.priority <= priority]
+        for item in upcoming + list(ahead):
+            text = item.text if isinstance(item, Utterance) else item
+            wait += audio_per_word * len(text.split())
+        return wait
+
+    def interrupt(self, text: str = None, flush: bool = True):
+        """Barge-in: stop speaking now; the next message starts on the next process_queue()"""
+        with self._lock:
+            dropped = [self._current] if self._current is not None else []
+            if flush:
+                dropped.extend(self._upcoming)
+                while True:
+                    try:
+                        item = self.message_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, Utterance):
+                        dropped.append(item)   # 流式消息：之后再送来的文本也不会合成
+            self.channel.stop()        # 也清掉声道上排队的块
+            self._playing = ()
+            # 排队中的任务直接取消；正在运行的任务在下一个检查点发现后放弃
+            cancelled_jobs = sum(utterance.cancel() for utterance in dropped)
+            self._current = None
+            self.interrupts += 1
+            self.cancelled_jobs += cancelled_jobs
+            if text:
+                # 替换的话直接排到最前面，不排在已预合成或已在队列里的紧急消息后面
+                self._upcoming.appendleft(self._prepare(text, URGENT))
+        metrics.INTERRUPTS.inc()
+        result = {"status": "interrupted", "cancelled_jobs": cancelled_jobs}
+        if text:
+            metrics.MESSAGES.labels("queued").inc()
+            result["message"] = {"status": "queued", "depth": self.message_queue.qsize(), "position": 0,
+                                 "dropped": 0, "estimated_start_s": 0.0}
+        self.wake()
+        return result
+
+    def open_stream(self, priority: int = NORMAL) -> "SpeechStream":
+        """Queue a message whose text arrives incrementally (e.g. LLM tokens)"""
+        stream = SpeechStream(self)
+        try:
+            self.message_queue.put(stream.utterance, priority)
+        except QueueFull as e:
+            metrics.MESSAGES.labels("rejected").inc()
+            raise QueueFull(e.depth, self.estimated_wait(self.message_queue.items(), priority)) from None
+        # 入队成功后才开始合成，被拒绝的流不占用合成资源
+        stream.utterance.auto_submit(self.scheduler, self._tts_worker)
+        metrics.MESSAGES.labels("queued").inc()
+        self.wake()
+        return stream
 
-        pipeline_idle = (
-            not self._generating and
-            not self._ready_mp3 and
-            not self.is_speaking
-        )
-        if pipeline_idle and not self.message_queue.empty():
-            self.speak(self.message_queue.get())
-
-
-    def speak(self, text: str):
-        """把整段文本切块、并行生成 MP3，并重置播放管线"""
-        words = text.split()
-        chunks = []
-        i = 0
-        size = self.chunk_size
-
-        # Define all separators we care about
-        SEPARATORS = r"[.,;:?!]"
-        LAST_SEPARATOR_REGEX = SEPARATORS + r"(?!.*" + SEPARATORS + ")"
-
-        while i < len(words):
-            end = min(i + size, len(words))
-            chunk_words = words[i:end]
-            chunk_text = " ".join(chunk_words)
-
-            # Look for the last punctuation mark within the current chunk
-            match = re.search(LAST_SEPARATOR_REGEX, chunk_text)
-            if match:
-                punct_index = chunk_text[:match.end()].count(" ")
-                end = min(i + punct_index + 1, i + size)
-                # print("end", end,"start", i, "size", size, chunk_text, match.group(0))
-                chunk_words = words[i:end]
-            
-            chunk = " ".join(chunk_words)
-            chunks.append(chunk)
-
-            i = end
-            size *= 2
-        
-        # 重置流水线
-        self._ready_mp3.clear()
-        self._next_play_idx = 0
-        self._total_chunks = len(chunks)
-        self._generated_cnt = 0
-        self._generating = True
-
-        # 并行生成
-        for idx, chunk in enumerate(chunks):
-            threading.Thread(
-                target=self._tts_worker,
-                args=(idx, chunk),
-                daemon=True,
-            ).start()
-            time.sleep(0.1)  # Avoid overwhelming the system with threads
-
-    def _tts_worker(self, idx: int, text: str):
+    def prewarm(self, phrases):
+        """Synthesize phrases into the TTS cache in the background, without playing them"""
+        return [
+            self.scheduler.submit(self._prewarm_chunk, idx, chunk, priority=PREWARM_PRIORITY)
+            for phrase in phrases
+            for idx, chunk in enumerate(self._split_chunks(phrase))
+        ]
+
+    def synthesize_chunks(self, text: str):
+        """Mixer-format PCM for every chunk of text, synthesized in parallel without playing it"""
+        chunks = self._split_chunks(text)
+        jobs = [self.scheduler.submit(self._synthesize_pcm, idx, chunk, priority=idx)
+                for idx, chunk in enumerate(chunks)]
+        return [job.result() for job in jobs]
+
+    def _prewarm_chunk(self, idx: int, text: str):
+        try:
+            self._synthesize_pcm(idx, text)
+        except Exception as e:
+            print(f"[TTS PREWARM ERROR] {e}")
+
+    def _split_chunks(self, text: str):
+        chunks = self._chunk_plans.get(text)
+        if chunks is not None:
+            self._chunk_plans.move_to_end(text)
+            return chunks
+        plan = self.chunk_controller.plan()
+        chunks = text_segmenter.segment(text, plan.target_words, plan.emitted)
+        self._chunk_plans[text] = chunks
+        if len(self._chunk_plans) > CHUNK_PLAN_CACHE_SIZE:
+            self._chunk_plans.popitem(last=False)
+        return chunks
+
+    def _synthesize_pcm(self, idx: int, text: str, utterance: Utterance = None) -> bytes:
+        """Mixer-format PCM for a chunk, from the TTS cache when possible"""
+        # 所有块使用同一语速，第一句不再比后面慢
+        speed_to_use = self.playback_speed
+        fmt = audio_utils.mixer_format()
+        key, pcm = self._cached_pcm(text, speed_to_use, fmt)
+        if pcm is not None:
+            return pcm
+
+        # 后端 → 内存中的音频文件 → 解码一次为 PCM，不写临时文件、不重新编码
+        self._check_cancelled(utterance, idx)
+        start = time.monotonic()
+        result = self.backend.synthesize(text, self.lang, self.tld)
+        synthesized = time.monotonic()
+        metrics.TTS_SYNTHESIS_SECONDS.labels(result.backend).observe(synthesized - start)
+        # 消息已被打断：不再花时间解码和变速
+        self._check_cancelled(utterance, idx)
+        pcm = self._postprocess(result, speed_to_use, fmt)
+        metrics.TIME_STRETCH_SECONDS.observe(time.monotonic() - synthesized)
+        self._record_synthesis(key, text, pcm, result.backend, start, fmt)
+        return pcm
+
+    def _stream_pcm(self, idx: int, text: str, utterance: Utterance) -> bytes:
+        """Like _synthesize_pcm(), but each part is also written to a ring buffer in
+        utterance.streams as soon as it is decoded, so playback overlaps the rest"""
+        speed_to_use = self.playback_speed
+        fmt = audio_utils.mixer_format()
+        key, pcm = self._cached_pcm(text, speed_to_use, fmt)
+        if pcm is not None:
+            return pcm
+        self._check_cancelled(utterance, idx)
+
+        frame_rate, sample_width, channels = fmt
+        stream = PCMRingBuffer(int(STREAM_BUFFER_SECONDS * frame_rate) * sample_width * channels)
+        utterance.add_stream(idx, stream)
+        start = time.monotonic()
+        backend = self.backend.name
+        pieces = []
+        waited = processed = 0.0
         try:
-            temp_path = f"temp_tts_{idx}.mp3"
-            path = f"tts_{idx}.mp3"
-            
-            if idx > 0:
-                gTTS(text=text, lang="en", tld="us").save(temp_path)
-                speed_to_use = 1.3
-                audio = AudioSegment.from_file(temp_path, format="mp3")
-                final = audio.speedup(playback_speed=speed_to_use)
-                final.export(path, format="mp3")
+            # 后端每返回一段（gTTS 约 100 字符一次请求）就解码、变速，连同 Sound 和口型时间线写入环形缓冲区，
+            # 主线程只负责把它交给 mixer
+            results = iter(self.backend.stream(text, self.lang, self.tld))
+            while True:
+                t = time.monotonic()
+                result = next(results, None)
+                waited += time.monotonic() - t
+                if result is None:
+                    break
+                self._check_cancelled(utterance, idx)
+                t = time.monotonic()
+                piece = self._postprocess(result, speed_to_use, fmt)
+                processed += time.monotonic() - t
+                stream.write(self._playable(piece, fmt), len(piece))
+                pieces.append(piece)
+                backend = result.backend
+                self.wake()
+        finally:
+            # 出错或被打断时也要关闭，播放端放完已写入的部分后继续下一块
+            stream.close()
+            self.wake()
+        pcm = b"".join(pieces)
+        metrics.TTS_SYNTHESIS_SECONDS.labels(backend).observe(waited)
+        metrics.TIME_STRETCH_SECONDS.observe(processed)
+        self._record_synthesis(key, text, pcm, backend, start, fmt)
+        return pcm
+
+    def _cached_pcm(self, text: str, speed: float, fmt):
+        """(cache key, cached PCM or None) for a chunk, counted as a cache hit or miss"""
+        key = TTSCache.key(text, self.lang, self.tld, speed, fmt, self.backend.name)
+        pcm = self.tts_cache.get(key)
+        metrics.TTS_CACHE_REQUESTS.labels("miss" if pcm is None else "hit").inc()
+        return key, pcm
+
+    def _postprocess(self, result, speed: float, fmt) -> bytes:
+        """Backend result → time-stretched PCM in mixer format"""
+        # 解码、变速、重采样是 CPU 密集的，放到子进程里做，不和渲染循环抢 GIL
+        postprocess = self.audio_processes.postprocess if self.audio_processes else audio_pool.postprocess
+        return postprocess(result.data, result.format, speed, fmt)
+
+    @staticmethod
+    def _playable(pcm: bytes, fmt):
+        """(Sound, lip-sync timeline) for PCM, built off the render thread"""
+        # 口型时间线随块一起算好，播放时只按位置查表
+        timeline = lip_sync.timeline(pcm, fmt, LIP_SYNC_STEP_SECONDS) if LIP_SYNC else b""
+        return audio_utils.pcm_to_sound(pcm), timeline
+
+    def _record_synthesis(self, key, text: str, pcm: bytes, backend: str, start: float, fmt):
+        frame_rate, sample_width, channels = fmt
+        self.chunk_controller.record(len(text.split()), time.monotonic() - start,
+                                     len(pcm) / (frame_rate * sample_width * channels))
+        # 备用后端的声音不同，不能存到主后端的缓存键下
+        if backend == self.backend.name:
+            self.tts_cache.put(key, pcm)
+
+    @staticmethod
+    def _check_cancelled(utterance: Utterance, idx: int):
+        if utterance is not None and utterance.cancelled:
+            raise CancelledError(f"message {utterance.order} chunk {idx} was interrupted")
+
+    def _tts_worker(self, idx: int, text: str, utterance: Utterance = None):
+        try:
+            # 正在说的消息的第一块边合成边播放；预合成的后续消息不必流式，它们有播放前的时间
+            if self.stream_first_chunk and idx == 0 and utterance is not None and utterance.started_at is not None:
+                pcm = self._stream_pcm(idx, text, utterance)
+                if idx in utterance.streams:
+                    print('streamed audio chunk', idx)
+                    return ReadyChunk(None, time.monotonic(), b"")
             else:
-                gTTS(text=text, lang="en", tld="us", slow=False).save(path)
-            
-            print('created audio', idx + 1, 'of', self._total_chunks)
-            with self._ready_lock:
-                self._ready_mp3[idx] = path
-                
+                pcm = self._synthesize_pcm(idx, text, utterance)
+            sound, timeline = self._playable(pcm, audio_utils.mixer_format())
+        except CancelledError:
+            metrics.TTS_CANCELLED.inc()
+            raise
         except Exception as e:
+            metrics.TTS_ERRORS.inc()
             print(f"[TTS ERROR] {e}")
-        finally:
-            with self._ready_lock:
-                self._generated_cnt += 1
-                if self._generated_cnt >= self._total_chunks:
-                    self._generating = False
+            raise
+        print('created audio chunk', idx)
+        return ReadyChunk(sound, time.monotonic(), timeline)
+
+
+class SpeechStream:
+    """
+    Incremental text feed for one queued message.
+
+    feed() runs the text through the segmenter; each complete chunk is
+    appended to the utterance and submitted for synthesis immediately, even
+    while earlier messages are still playing. close() flushes the rest and
+    marks the end of the message.
+    """
+
+    def __init__(self, speech_manager: SpeechManager):
+        self.speech_manager = speech_manager
+        plan = speech_manager.chunk_controller.plan()
+        self.segmenter = text_segmenter.SentenceSegmenter(plan.target_words, plan.emitted)
+        self.utterance = Utterance("", [], order=next(speech_manager._order), closed=False,
+                                   on_done=speech_manager.wake)
+
+    def feed(self, text: str):
+        for chunk in self.segmenter.feed(text):
+            self.utterance.append(chunk)
+
+    def close(self):
+        if self.utterance.closed:
+            return
+        for chunk in self.segmenter.flush():
+            self.utterance.append(chunk)
+        self.utterance.close()
+        # 没有新块时，主循环也要知道这条消息已经结束
+        self.speech_manager.wake()
 
 
 if __name__ == "__main__":
@@ -145,8 +545,10 @@ if __name__ == "__main__":
         "automáticamente en partes de diez palabras para ser procesado "
         "correctamente por el sistema de síntesis de voz."
     )
-    sm.speak(msg)
+    sm.message_queue.put(msg)
 
-    # keep main thread alive until playback thread ends
-    while sm.playback_thread.is_alive():
-        time.sleep(0.1)
+    # drive playback the way the pygame main loop would
+    sm.process_queue()
+    while sm._current or sm.is_speaking:
+        sm.process_queue()
+        time.sleep(0.01)
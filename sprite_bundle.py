@@ -0,0 +1,158 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import pygame
+
+MAGIC = b"AVBNDL01"
+HEADER = struct.Struct("<8sI")     # magic, manifest length
+ALIGN = 64
+BUNDLE_DIR = "bundles"
+
+
+def bundle_path(character_name, scale, bundle_dir=BUNDLE_DIR):
+    """Where the bundle for a (character, scale) pair lives"""
+    return os.path.join(bundle_dir, f"{character_name}@{scale:g}.bundle")
+
+
+def _frame_files(sequence_dir, asset_name):
+    """PNG frames of a sequence, ordered by frame number"""
+    pattern = re.compile(rf"{re.escape(asset_name)}(\d+)\.png$")
+    numbered = []
+    for name in os.listdir(sequence_dir):
+        match = pattern.match(name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    return [os.path.join(sequence_dir, name) for _, name in sorted(numbered)]
+
+
+def compile_bundle(character_name, scale, assets_dir="assets", out_path=None):
+    """Decode and pre-scale assets/<character>/<state>/<direction>/ into one packed file"""
+    out_path = out_path or bundle_path(character_name, scale)
+    character_dir = os.path.join(assets_dir, character_name)
+    sequences = {}
+    blobs = []
+    offset = 0
+
+    for state in sorted(os.listdir(character_dir)):
+        state_dir = os.path.join(character_dir, state)
+        if not os.path.isdir(state_dir):
+            continue
+        for direction in sorted(os.listdir(state_dir)):
+            sequence_dir = os.path.join(state_dir, direction)
+            if not os.path.isdir(sequence_dir):
+                continue
+            frames = []
+            for path in _frame_files(sequence_dir, state):
+                img = pygame.image.load(path)
+                if scale != 1.0:
+                    # Same rounding and filter as CharacterAnimation._load_sequence
+                    size = (int(img.get_width() * scale),
+                            int(img.get_height() * scale))
+                    img = pygame.transform.scale(img, size)
+                data = pygame.image.tobytes(img, "RGBA")
+                # Source name and mtime let open_for() notice PNGs edited after the bundle was built
+                frames.append({"offset": offset, "width": img.get_width(), "height": img.get_height(),
+                               "source": os.path.basename(path), "mtime": os.stat(path).st_mtime_ns})
+                padding = -len(data) % ALIGN
+                blobs.append(data + b"\0" * padding)
+                offset += len(data) + padding
+            if frames:
+                sequences[f"{state}/{direction}"] = frames
+
+    manifest = json.dumps({
+        "character": character_name,
+        "scale": scale,
+        "format": "RGBA",
+        "sequences": sequences,
+    }).encode("utf-8")
+    data_start = HEADER.size + len(manifest)
+    data_start += -data_start % ALIGN
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(manifest)))
+        f.write(manifest)
+        f.write(b"\0" * (data_start - HEADER.size - len(manifest)))
+        for blob in blobs:
+            f.write(blob)
+    return out_path
+
+
+class SpriteBundle:
+    """Memory-mapped, pre-scaled RGBA frames produced by compile_bundle()"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, manifest_len = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a sprite bundle: {path}")
+        manifest_end = HEADER.size + manifest_len
+        self.manifest = json.loads(self._map[HEADER.size:manifest_end].decode("utf-8"))
+        self._data_start = manifest_end + (-manifest_end % ALIGN)
+        self.scale = self.manifest["scale"]
+        self.sequences = self.manifest["sequences"]
+
+    @classmethod
+    def open_for(cls, character_name, scale, bundle_dir=BUNDLE_DIR, frames_count=0, assets_dir="assets"):
+        """Open the prebaked bundle for (character, scale), or None if it was never built or is out of date"""
+        path = bundle_path(character_name, scale, bundle_dir)
+        if not os.path.exists(path):
+            return None
+        bundle = cls(path)
+        reason = bundle.stale(os.path.join(assets_dir, character_name), frames_count)
+        if reason:
+            print(f"[BUNDLE] Ignoring {path}: {reason}. "
+                  f"Rebuild with: python sprite_bundle.py {character_name} --scale {scale:g}")
+            bundle.close()
+            return None
+        return bundle
+
+    def stale(self, character_dir, frames_count=0):
+        """Why the bundle no longer matches the PNGs in character_dir, or None if it does"""
+        for key, frames in self.sequences.items():
+            if len(frames) < frames_count:
+                return f"{key} has {len(frames)} of {frames_count} frames"
+            sequence_dir = os.path.join(character_dir, key)
+            sources = _frame_files(sequence_dir, key.split("/")[0]) if os.path.isdir(sequence_dir) else []
+            current = [(os.path.basename(path), os.stat(path).st_mtime_ns) for path in sources]
+            if current != [(frame.get("source"), frame.get("mtime")) for frame in frames]:
+                return f"{key} frames changed since it was built"
+        return None
+
+    def has(self, state, direction):
+        return f"{state}/{direction}" in self.sequences
+
+    def load_frame(self, state, direction, i):
+        """Create a display-format surface straight from the mapped pixel buffer"""
+        entry = self.sequences[f"{state}/{direction}"][i]
+        size = (entry["width"], entry["height"])
+        start = self._data_start + entry["offset"]
+        view = memoryview(self._map)[start:start + size[0] * size[1] * 4]
+        mapped = pygame.image.frombuffer(view, size, "RGBA")
+        frame = mapped.convert_alpha()
+        del mapped
+        view.release()
+        return frame
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a character's PNG frames into a sprite bundle")
+    parser.add_argument("character")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--assets", default="assets")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    pygame.init()
+    path = compile_bundle(args.character, args.scale, args.assets, args.out)
+    print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
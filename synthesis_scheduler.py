@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Jobs at this priority (e.g. cache prewarming) only run when nothing else is waiting
+BACKGROUND = float("inf")
+
+
+class SynthesisScheduler:
+    """
+    Fixed pool of synthesis workers fed from per-group priority queues.
+
+    Within a group, lower priority values run first; jobs with equal priority
+    run in submission order. Groups (one per hosted avatar) take turns, so a
+    group with a long backlog cannot starve the others. submit() never blocks
+    and returns a Future.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self._groups = OrderedDict()   # group -> heap of jobs; iteration order is whose turn it is
+        self._pending = 0
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"synthesis-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, priority=0, group=None) -> Future:
+        future = Future()
+        with self._cond:
+            heapq.heappush(self._groups.setdefault(group, []), (priority, next(self._seq), future, fn, args))
+            self._pending += 1
+            self._cond.notify()
+        return future
+
+    def group(self, name) -> "SchedulerGroup":
+        """View of this pool that submits into one group"""
+        return SchedulerGroup(self, name)
+
+    def shutdown(self):
+        """Stop the workers once every queued job has run"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _take(self):
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            # First group in turn order with foreground work, else any group
+            heaps = [(group, heap) for group, heap in self._groups.items() if heap]
+            group, heap = next(((g, h) for g, h in heaps if h[0][0] != BACKGROUND), heaps[0])
+            job = heapq.heappop(heap)
+            self._pending -= 1
+            # Its turn is over
+            if heap:
+                self._groups.move_to_end(group)
+            else:
+                del self._groups[group]
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._take()
+            if job is None:
+                return
+            _, _, future, fn, args = job
+            # Skips jobs that were cancelled while queued
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class SchedulerGroup:
+    """A SynthesisScheduler as seen by one group (e.g. one avatar's SpeechManager)"""
+
+    def __init__(self, scheduler: SynthesisScheduler, name):
+        self.scheduler = scheduler
+        self.name = name
+        self.workers = scheduler.workers
+
+    def submit(self, fn, *args, priority=0) -> Future:
+        return self.scheduler.submit(fn, *args, priority=priority, group=self.name)
+
+    def shutdown(self):
+        self.scheduler.shutdown()
@@ -0,0 +1,17 @@
+from text_segmenter import SentenceSegmenter, segment
+
+
+def test_no_before_a_number_is_an_abbreviation():
+    assert segment("Room No. 12 is free. I said no. Fine", 2) == ["Room No. 12", "is free.", "I said no.", "Fine"]
+
+
+def test_no_ends_a_sentence_without_a_number():
+    assert segment("I said no. Then we left.", 3) == ["I said no.", "Then we left."]
+
+
+def test_no_split_across_feeds():
+    segmenter = SentenceSegmenter(2)
+    chunks = []
+    for piece in ("I said n", "o.", " Then", " we left."):
+        chunks += segmenter.feed(piece)
+    assert chunks + segmenter.flush() == ["I said no.", "Then we left."]
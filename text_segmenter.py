@@ -0,0 +1,140 @@
+import re
+
+STRONG_END = ".?!"
+SOFT_END = ",;:"
+ELLIPSES = ("...", "…")
+CLOSERS = "\"')]}”’»"
+
+# Words ending in "." that don't end a sentence
+ABBREVIATIONS = {
+    "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "etc.", "e.g.", "i.e.",
+    "approx.", "fig.", "inc.", "ltd.", "co.", "corp.", "dept.", "est.", "mt.", "ave.",
+    "jan.", "feb.", "mar.", "apr.", "jun.", "jul.", "aug.", "sep.", "sept.", "oct.", "nov.", "dec.",
+}
+# Abbreviations only when a number follows: "No. 5" but "I said no."
+NUMBER_ABBREVIATIONS = {"no."}
+INITIAL = re.compile(r"^(?:[A-Za-z]\.)+$")      # "J." or "U.S."
+# Last characters worth a closer look; anything else can't be a boundary
+MAYBE_BOUNDARY = set(STRONG_END + SOFT_END + CLOSERS + "…")
+
+NONE, SOFT, STRONG = 0, 1, 2
+
+
+def boundary(word: str) -> int:
+    """How strongly a word ends a clause: NONE, SOFT (comma-like) or STRONG (sentence end)"""
+    core = word.rstrip(CLOSERS)
+    if not core:
+        return NONE
+    if core.endswith(ELLIPSES):
+        return SOFT
+    last = core[-1]
+    if last in "?!":
+        return STRONG
+    if last == ".":
+        if core.lower() in ABBREVIATIONS or INITIAL.match(core):
+            return NONE
+        return STRONG
+    if last in SOFT_END:
+        return SOFT
+    return NONE
+
+
+class SentenceSegmenter:
+    """
+    Single-pass, incremental splitter of text into speakable chunks.
+
+    Text can arrive in arbitrary pieces via feed(); each word is classified
+    once and chunks are emitted as soon as a suitable boundary is seen:
+
+    - at a sentence or clause end once the chunk has `target_words(idx)` words
+    - otherwise, once it reaches 1.5x the target, at the last sentence end
+      (or clause end) inside it, falling back to a hard cut
+
+    Chunk text is joined once at emission, so total work is linear in the
+    input length. `on_chunk(idx, words)` is called for every emitted chunk.
+    """
+
+    def __init__(self, target_words, on_chunk=None):
+        self.target_words = target_words if callable(target_words) else (lambda idx: target_words)
+        self.on_chunk = on_chunk
+        self._partial = ""          # unfinished last word of the previous feed()
+        self._words = []
+        self._last_strong = 0       # word count up to the last sentence end in _words
+        self._last_soft = 0
+        self._emitted = 0
+        self._target = None
+        self._pending_end = False   # last word is "no."-like; the next word decides if it ends a sentence
+
+    def feed(self, text: str):
+        """Consume more text; return the chunks that became complete"""
+        if not text:
+            return []
+        chunks = []
+        words = text.split()
+        if self._partial:
+            if text[0].isspace():
+                self._add(self._partial, chunks)
+            elif words:
+                words[0] = self._partial + words[0]
+            else:
+                words = [self._partial]
+            self._partial = ""
+        if words and not text[-1].isspace():
+            self._partial = words.pop()
+        for word in words:
+            self._add(word, chunks)
+        return chunks
+
+    def flush(self):
+        """End of text: return whatever is left as final chunk(s)"""
+        chunks = []
+        if self._partial:
+            self._add(self._partial, chunks)
+            self._partial = ""
+        self._pending_end = False
+        if self._words:
+            self._emit(len(self._words), chunks)
+        return chunks
+
+    def _add(self, word, chunks):
+        if self._pending_end:
+            self._pending_end = False
+            if self._words and not word[0].isdigit():
+                self._mark(len(self._words), STRONG, chunks)
+        self._words.append(word)
+        kind = boundary(word) if word[-1] in MAYBE_BOUNDARY else NONE
+        if kind == STRONG and word.lower() in NUMBER_ABBREVIATIONS:
+            self._pending_end = True
+            kind = NONE
+        self._mark(len(self._words), kind, chunks)
+
+    def _mark(self, count, kind, chunks):
+        """Record the boundary after word `count` and emit if the chunk is long enough"""
+        if kind == STRONG:
+            self._last_strong = count
+        if kind != NONE:
+            self._last_soft = count
+
+        if self._target is None:
+            self._target = max(int(self.target_words(self._emitted)), 1)
+        target = self._target
+        if kind != NONE and count >= target:
+            self._emit(count, chunks)
+        elif count >= target * 3 // 2:
+            self._emit(self._last_strong or self._last_soft or count, chunks)
+
+    def _emit(self, count, chunks):
+        chunks.append(" ".join(self._words[:count]))
+        if self.on_chunk:
+            self.on_chunk(self._emitted, count)
+        self._emitted += 1
+        self._target = None
+        del self._words[:count]
+        self._last_strong = max(self._last_strong - count, 0)
+        self._last_soft = max(self._last_soft - count, 0)
+
+
+def segment(text: str, target_words, on_chunk=None):
+    """Split a complete text in one call"""
+    segmenter = SentenceSegmenter(target_words, on_chunk)
+    return segmenter.feed(text) + segmenter.flush()
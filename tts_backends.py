@@ -0,0 +1,251 @@
+import io
+import math
+import textwrap
+import threading
+import time
+import wave
+import zlib
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from gtts import gTTS
+
+# Encoded audio as returned by a backend, and which backend actually produced it
+SynthesisResult = namedtuple("SynthesisResult", "data format backend")
+
+
+class TTSBackend:
+    """Turns a chunk of text into an encoded audio file held in memory"""
+    name = "base"
+
+    def synthesize(self, text: str, lang: str, tld: str) -> SynthesisResult:
+        raise NotImplementedError
+
+    def stream(self, text: str, lang: str, tld: str):
+        """Yields the audio in consecutive, separately decodable parts as they arrive"""
+        yield self.synthesize(text, lang, tld)
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS over the network (MP3)"""
+    name = "gtts"
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def synthesize(self, text, lang, tld):
+        mp3 = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=tld, slow=False, timeout=self.timeout).write_to_fp(mp3)
+        return SynthesisResult(mp3.getvalue(), "mp3", self.name)
+
+    def stream(self, text, lang, tld):
+        # gTTS makes one request per ~100 characters; each answer is a complete MP3
+        for part in gTTS(text=text, lang=lang, tld=tld, slow=False, timeout=self.timeout).stream():
+            yield SynthesisResult(part, "mp3", self.name)
+
+
+class ToneBackend(TTSBackend):
+    """
+    Offline, deterministic stand-in for a real voice (WAV).
+
+    Every word becomes a short tone whose pitch and length derive from the
+    word itself, with pauses after punctuation, so output duration tracks the
+    text like real speech. Like gTTS, text is requested in parts of at most
+    `part_chars` characters; `latency` simulates each part's network round trip.
+    """
+    name = "tone"
+
+    def __init__(self, frame_rate=24000, latency=0.0, part_chars=100):
+        self.frame_rate = frame_rate
+        self.latency = latency
+        self.part_chars = part_chars
+
+    def synthesize(self, text, lang, tld):
+        samples = array("h")
+        for part in textwrap.wrap(text, self.part_chars):
+            samples.extend(self._part(part))
+        return SynthesisResult(self._wav(samples), "wav", self.name)
+
+    def stream(self, text, lang, tld):
+        for part in textwrap.wrap(text, self.part_chars):
+            yield SynthesisResult(self._wav(self._part(part)), "wav", self.name)
+
+    def _part(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        samples = array("h")
+        for word in text.split():
+            samples.extend(self._tone(word))
+            pause = 0.25 if word[-1] in ".,;:?!" else 0.05
+            samples.extend(array("h", bytes(2 * int(self.frame_rate * pause))))
+        return samples
+
+    def _wav(self, samples):
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.frame_rate)
+            w.writeframes(samples.tobytes())
+        return buf.getvalue()
+
+    def _tone(self, word):
+        digest = zlib.crc32(word.lower().encode("utf-8"))
+        frequency = 140 + digest % 120
+        duration = min(max(0.06 * len(word), 0.12), 0.45)
+        period = max(int(self.frame_rate / frequency), 1)
+        cycle = [int(6000 * math.sin(2 * math.pi * i / period)) for i in range(period)]
+        count = int(self.frame_rate * duration)
+        tone = array("h", cycle * (count // period + 1))[:count]
+        # Short linear fades avoid clicks between words
+        fade = min(int(self.frame_rate * 0.005), count // 2)
+        for i in range(fade):
+            tone[i] = tone[i] * i // fade
+            tone[count - 1 - i] = tone[count - 1 - i] * i // fade
+        return tone
+
+
+class HedgedBackend(TTSBackend):
+    """
+    Adds timeouts, retries and hedging to another backend.
+
+    Each attempt starts the primary backend; if it hasn't answered within the
+    hedge delay (a percentile of recent latencies) a second request is fired,
+    on the alternate backend if one is configured, and the first successful
+    answer wins. Attempts that exceed `timeout` are abandoned and retried.
+    """
+
+    def __init__(self, primary: TTSBackend, alternate: TTSBackend = None, timeout=10.0, retries=1,
+                 hedge_percentile=0.95, hedge_delay=2.0, min_samples=10, max_workers=8):
+        self.primary = primary
+        self.alternate = alternate
+        self.name = primary.name
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=200)
+        # Time to a stream's first part is much shorter than a whole request, so it gets its own window
+        self._first_part_latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-request")
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    @property
+    def hedge_delay(self):
+        """Latency percentile after which a hedge request is launched"""
+        return self._hedge_delay(self._latencies)
+
+    @property
+    def first_part_hedge_delay(self):
+        """Same as hedge_delay, for the wait on a stream's first part"""
+        return self._hedge_delay(self._first_part_latencies)
+
+    def _hedge_delay(self, latencies):
+        with self._lock:
+            samples = sorted(latencies)
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        return samples[min(int(len(samples) * self.hedge_percentile), len(samples) - 1)]
+
+    def synthesize(self, text, lang, tld):
+        last_error = None
+        for _ in range(self.retries + 1):
+            try:
+                return self._attempt(text, lang, tld)
+            except Exception as e:
+                last_error = e
+                print(f"[TTS RETRY] {type(e).__name__}: {e}")
+        raise last_error
+
+    def stream(self, text, lang, tld):
+        # The wait for the first part is hedged and bounded like a whole attempt: if the
+        # hedge request wins, its complete audio is yielded instead. Once audio is out,
+        # later parts follow the primary (its own timeout bounds each request). A stream
+        # that fails or times out before its first part falls back to the retried path.
+        start = time.monotonic()
+        parts = self.primary.stream(text, lang, tld)
+        first = self._executor.submit(next, parts, None)
+        try:
+            winner = self._race(first, text, lang, tld, start, self._first_part_latencies)
+        except Exception as e:
+            print(f"[TTS RETRY] {type(e).__name__}: {e}")
+            yield self.synthesize(text, lang, tld)
+            return
+        if winner is not first:
+            yield winner.result()
+            return
+        result = winner.result()
+        if result is not None:
+            yield result
+            yield from parts
+
+    def _attempt(self, text, lang, tld):
+        start = time.monotonic()
+        first = self._executor.submit(self.primary.synthesize, text, lang, tld)
+        return self._race(first, text, lang, tld, start, self._latencies).result()
+
+    def _race(self, first, text, lang, tld, start, latencies):
+        """
+        Wait for `first`, hedging it after the percentile of `latencies`; returns the
+        first future to succeed and records its latency in that window
+        """
+        deadline = start + self.timeout
+        pending = {first}
+        hedged = False
+        error = None
+
+        done, _ = wait(pending, timeout=min(self._hedge_delay(latencies), self.timeout))
+        while True:
+            for future in done:
+                pending.discard(future)
+                if future.exception() is None:
+                    self._record(latencies, time.monotonic() - start, hedged and future is not first)
+                    return future
+                error = future.exception()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise TimeoutError(f"TTS request exceeded {self.timeout:g}s")
+            if not hedged:
+                # Primary is slow (or failed fast): race a second request against it
+                hedged = True
+                self.hedges += 1
+                backend = self.alternate or self.primary
+                pending.add(self._executor.submit(backend.synthesize, text, lang, tld))
+            if not pending:
+                raise error
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    def _record(self, latencies, latency, hedge_won):
+        with self._lock:
+            latencies.append(latency)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    @property
+    def stats(self):
+        return {
+            "hedge_delay": self.hedge_delay,
+            "first_part_hedge_delay": self.first_part_hedge_delay,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+        }
+
+
+BACKENDS = {
+    "gtts": GTTSBackend,
+    "tone": ToneBackend,
+}
+
+
+def create_backend(name="gtts", alternate=None, timeout=10.0, retries=1, hedge_percentile=0.95):
+    """Build a named backend wrapped with timeouts, retries and hedging"""
+    primary = GTTSBackend(timeout=timeout) if name == "gtts" else BACKENDS[name]()
+    alternate_backend = BACKENDS[alternate]() if alternate else None
+    return HedgedBackend(primary, alternate_backend, timeout=timeout, retries=retries,
+                         hedge_percentile=hedge_percentile)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+class TTSCache:
+    """
+    Two-tier (memory + disk) cache of post-processed chunk audio.
+
+    Entries are mixer-format PCM keyed by everything that changes the samples:
+    text, voice (backend/lang/tld), playback speed and the PCM format. Both tiers are
+    size-bounded and evict least recently used entries.
+    """
+
+    def __init__(self, memory_bytes=64 * 1024 * 1024, disk_dir=".tts_cache", disk_bytes=512 * 1024 * 1024):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()        # key -> pcm
+        self._memory_used = 0
+        self._disk = OrderedDict()          # key -> size, oldest first
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def key(text, lang, tld, speed, fmt, backend="gtts"):
+        raw = "\0".join([text, backend, lang, tld, f"{speed:g}", ",".join(map(str, fmt))])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Cached PCM for key, or None"""
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return pcm
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    pcm = f.read()
+                os.utime(self._path(key))   # mtime keeps LRU order across restarts
+            except OSError:
+                pcm = None
+            with self._lock:
+                if pcm is None:
+                    self._forget_disk(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._remember(key, pcm)
+                    return pcm
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, pcm):
+        with self._lock:
+            self._remember(key, pcm)
+            write_disk = self.disk_dir and key not in self._disk
+        if write_disk:
+            tmp_path = self._path(key) + f".{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pcm)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                # Disk full or read-only: the entry stays memory-only
+                print(f"[TTS CACHE ERROR] {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+            with self._lock:
+                if key not in self._disk:
+                    self._disk[key] = len(pcm)
+                    self._disk_used += len(pcm)
+                self._evict_disk()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remember(self, key, pcm):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = pcm
+        self._memory_used += len(pcm)
+        while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+            _, old = self._memory.popitem(last=False)
+            self._memory_used -= len(old)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+            key = next(iter(self._disk))
+            self._forget_disk(key)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def _forget_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_used -= size
+
+    def _scan_disk(self):
+        """Index existing cache files, least recently used first"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".pcm"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+        self._evict_disk()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".pcm")
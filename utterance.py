@@ -0,0 +1,107 @@
+import threading
+from collections import namedtuple
+from message_queue import NORMAL
+
+# Later messages' chunks always rank behind earlier messages' chunks
+PRIORITY_STRIDE = 10_000
+
+# Result of a synthesis job: playable audio and when it became ready (time.monotonic())
+ReadyChunk = namedtuple("ReadyChunk", "sound ready_at lip_sync")
+
+
+class Utterance:
+    """
+    One message being spoken: its text chunks and the synthesis job for each.
+
+    Streamed messages start open (closed=False) and grow through append()
+    while they may already be playing; they finish only after close().
+
+    Every job is submitted as synthesize(idx, text, utterance), so workers can
+    tell which message a chunk belongs to (utterance.order is its id) and stop
+    early once cancel() has been called.
+    """
+
+    def __init__(self, text: str, chunks, order: int = 0, closed: bool = True, on_done=None,
+                 priority: int = NORMAL):
+        self.text = text
+        self.order = order
+        self.priority = priority       # message queue priority it was taken off with
+        self.chunks = list(chunks)
+        self.jobs = []                 # Future per submitted chunk, in order
+        self.streams = {}              # idx -> PCMRingBuffer of a chunk playing while it is synthesized
+        self.next_play_idx = 0
+        self.play_end = None           # when the chunk handed to the mixer last will end
+        self.started_at = None         # when it became the message being spoken
+        self.closed = closed
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._auto_submit = None       # (scheduler, synthesize) for chunks appended later
+        self._on_done = on_done        # called with each job's Future once it has its result
+
+    def append(self, chunk: str):
+        """Add a chunk to an open utterance, submitting it right away if auto-submit is on"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.text = f"{self.text} {chunk}" if self.text else chunk
+            self.chunks.append(chunk)
+            if self._auto_submit:
+                self._submit(*self._auto_submit, self.total_chunks)
+
+    def close(self):
+        self.closed = True
+
+    def cancel(self) -> int:
+        """Drop the message: queued jobs never run, running ones stop at their next check"""
+        with self._lock:
+            self.cancelled = True
+            self.closed = True
+            self._auto_submit = None
+            for stream in self.streams.values():
+                stream.abort()
+            return sum(job.cancel() for job in self.jobs)
+
+    def add_stream(self, idx: int, stream):
+        """Publish a chunk's ring buffer so playback can start before its job is done"""
+        with self._lock:
+            if self.cancelled:
+                stream.abort()
+            self.streams[idx] = stream
+
+    def auto_submit(self, scheduler, synthesize):
+        """Submit every chunk as soon as it is appended (and the ones already there)"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self._auto_submit = (scheduler, synthesize)
+            self._submit(scheduler, synthesize, self.total_chunks)
+
+    @property
+    def total_chunks(self) -> int:
+        return len(self.chunks)
+
+    def submit(self, scheduler, synthesize, stop=None):
+        """Queue synthesis for chunks not submitted yet, up to (not including) stop"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self._submit(scheduler, synthesize, self.total_chunks if stop is None else min(stop, self.total_chunks))
+
+    def _submit(self, scheduler, synthesize, stop):
+        for idx in range(len(self.jobs), stop):
+            priority = self.order * PRIORITY_STRIDE + idx
+            job = scheduler.submit(synthesize, idx, self.chunks[idx], self, priority=priority)
+            if self._on_done:
+                job.add_done_callback(self._on_done)
+            self.jobs.append(job)
+
+    def next_job(self):
+        """Job of the next chunk to play, or None if it hasn't been submitted"""
+        if self.next_play_idx < len(self.jobs):
+            return self.jobs[self.next_play_idx]
+        return None
+
+    @property
+    def finished(self) -> bool:
+        """Every chunk has been handed to the mixer (or skipped after an error), or it was cancelled"""
+        return self.cancelled or self.closed and self.next_play_idx >= self.total_chunks
@@ -1,19 +1,115 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, abort, request, jsonify
 import threading
+import time
+import api
+import metrics
+from constants import MESSAGE_STREAM_IDLE_SECONDS
 from speech_manager import SpeechManager
 
 app = Flask(__name__)
 
-def create_web_server(speech_manager: SpeechManager, port=5001):
-    @app.route("/post-message", methods=["POST"])
-    def post_msg():
-        data = request.get_json(silent=True) or {}
-        if not data.get("text"):
-            return jsonify(error="Missing 'text'"), 400
-        speech_manager.message_queue.put(data["text"])
-        return jsonify(status="queued")
-    
+
+class IdleTimer:
+    """Calls on_idle (on a timer thread) once touch() hasn't been called for `timeout` seconds"""
+
+    def __init__(self, timeout, on_idle):
+        self.timeout = timeout
+        self.on_idle = on_idle
+        self.last = time.monotonic()
+        self.fired = False
+        self._cancelled = False
+        self._arm(timeout)
+
+    def touch(self):
+        self.last = time.monotonic()
+
+    def cancel(self):
+        self._cancelled = True
+        self._timer.cancel()
+
+    def _arm(self, delay):
+        self._timer = threading.Timer(delay, self._check)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _check(self):
+        if self._cancelled:
+            return
+        idle = time.monotonic() - self.last
+        if idle < self.timeout:
+            self._arm(self.timeout - idle)
+            return
+        self.fired = True
+        self.on_idle()
+
+def create_web_server(speech_managers, port=5001):
+    """speech_managers: a SpeechManager, or {name: SpeechManager} served under /<name>/... (first one unprefixed too)"""
+    if isinstance(speech_managers, SpeechManager):
+        speech_managers = {speech_managers.name: speech_managers}
+    default = next(iter(speech_managers.values()))
+
+    def avatar(name):
+        if name is None:
+            return default
+        if name not in speech_managers:
+            abort(404)
+        return speech_managers[name]
+
+    def route(handler):
+        def view(name=None):
+            payload, status = handler(avatar(name), request.get_json(silent=True) or {})
+            if isinstance(payload, str):
+                return Response(payload, status, content_type=metrics.CONTENT_TYPE)
+            return jsonify(payload), status
+        return view
+
+    for (method, path), handler in api.ROUTES.items():
+        view = route(handler)
+        app.add_url_rule(path, handler.__name__, view, methods=[method])
+        app.add_url_rule("/<name>" + path, "avatar_" + handler.__name__, view, methods=[method])
+
+    @app.route("/stream-message", methods=["POST"])
+    @app.route("/<name>/stream-message", methods=["POST"])
+    def stream_msg(name=None):
+        """NDJSON body, usually sent with chunked transfer encoding while an LLM generates"""
+        speech_manager = avatar(name)
+        priority = api.priority_of(request.args)
+        if priority is None:
+            return jsonify({"error": "Invalid 'priority'"}), 400
+        try:
+            stream = api.MessageStream(speech_manager, priority)
+        except api.QueueFull as e:
+            payload, status = api.queue_full(e)
+            return jsonify(payload), status
+        error = None
+        # The request thread blocks in the read, so a producer that stops sending without
+        # closing the connection is ended from a timer; later lines are ignored
+        lock = threading.Lock()
+
+        def end_idle_stream():
+            with lock:
+                stream.finish()
+
+        idle = IdleTimer(MESSAGE_STREAM_IDLE_SECONDS, end_idle_stream)
+        try:
+            for line in request.stream:
+                with lock:
+                    if idle.fired:
+                        break
+                    idle.touch()
+                    error = stream.line(line)
+                if error or stream.ended:
+                    break
+        finally:
+            idle.cancel()
+            with lock:
+                result = stream.finish()
+        if idle.fired:
+            error = {"error": f"No data for {MESSAGE_STREAM_IDLE_SECONDS}s"}, 408
+        payload, status = error or result
+        return jsonify(payload), status
+
     threading.Thread(
         target=lambda: app.run(port=port, host="0.0.0.0"),
         daemon=True
-    ).start()
\ No newline at end of file
+    ).start()